@@ -205,16 +205,17 @@ class ChatInterface:
                 score = fragment.get('score', 0)
                 if score > files_dict[file_name]['max_score']:
                     files_dict[file_name]['max_score'] = score
-                    content = fragment.get('content', '')
-                    files_dict[file_name]['content_preview'] = content[:500] if content else ''
+                    files_dict[file_name]['content_preview'] = fragment.get('content') or ''
             
             # Formatear resumen por archivo
             for i, (file_name, info) in enumerate(sorted(files_dict.items(), key=lambda x: x[1]['max_score'], reverse=True), 1):
                 formatted += f"{i}. **{file_name}**\n"
                 formatted += f"   - Fragmentos encontrados: {info['count']}\n"
                 formatted += f"   - Relevancia máxima: {info['max_score']:.4f}\n"
-                if info['content_preview']:
-                    formatted += f"   - Vista previa: {info['content_preview'][:200]}...\n"
+                content = info['content_preview']
+                if content:
+                    preview = content[:200] + "..." if len(content) > 200 else content
+                    formatted += f"   - Vista previa: {preview}\n"
                 formatted += "\n"
         else:
             formatted += "No se encontraron resultados.\n"
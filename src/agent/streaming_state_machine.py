@@ -9,12 +9,17 @@ Responsabilidad: Gestionar el streaming de tokens con certeza absoluta
 """
 
 import logging
+import re
 from typing import Optional, Dict, List
 from enum import Enum
 
 from streaming_display import StreamingDisplay
 
 
+# Secuencias de dos o más saltos de línea (se colapsan a un solo \n)
+_NEWLINE_RUN_RE = re.compile(r'\n{2,}')
+
+
 class StreamState(Enum):
     """Estados posibles de la máquina de streaming"""
     NEUTRAL = "neutral"
@@ -111,7 +116,24 @@ class StreamingStateMachine:
         self.buffer += token
         self.accumulated_text += token
         
-        # Procesar según el estado actual
+        self._process_state()
+    
+    def feed_chunk(self, chunk: str) -> None:
+        """
+        Alimenta un fragmento de texto de cualquier tamaño a la máquina de estados
+        
+        Equivale a alimentar el fragmento carácter a carácter, pero el
+        preprocesamiento de saltos de línea se hace en una sola pasada y las
+        transiciones se resuelven en los límites de los tags encontrados, aunque
+        el fragmento contenga varios bloques completos.
+        
+        Args:
+            chunk: Fragmento de texto recibido
+        """
+        self.feed_token(chunk)
+    
+    def _process_state(self) -> None:
+        """Procesa el buffer según el estado actual"""
         if self.state == StreamState.NEUTRAL:
             self._process_neutral_state()
         elif self.state == StreamState.IN_THINKING:
@@ -129,44 +151,50 @@ class StreamingStateMachine:
         
         Busca tags de apertura y libera texto plano cuando está seguro
         """
-        # Buscar tags de apertura (ordenados por longitud para evitar matches parciales)
-        sorted_tags = sorted(self.opening_tags.items(), key=lambda x: len(x[0]), reverse=True)
-        
-        for tag, next_state in sorted_tags:
-            if tag in self.buffer:
-                # Encontrado tag completo
-                before_tag = self.buffer.split(tag)[0]
-                after_tag = self.buffer.split(tag, 1)[1]
-                
-                # Limpiar marcadores de código markdown antes del tag
-                before_tag_clean = before_tag.rstrip()
-                if before_tag_clean.endswith('```xml'):
-                    before_tag_clean = before_tag_clean[:-6].rstrip()
-                elif before_tag_clean.endswith('```'):
-                    before_tag_clean = before_tag_clean[:-3].rstrip()
-                elif before_tag_clean.endswith('xml'):
-                    before_tag_clean = before_tag_clean[:-3].rstrip()
-                
-                # Liberar texto antes del tag (si hay)
-                if before_tag_clean.strip():
-                    self.display.stream_plain_text(before_tag_clean)
-                
-                # Cambiar de estado
-                old_state = self.state
-                self.state = next_state
-                self.buffer = after_tag
-                
-                self.logger.debug(f"Transición: {old_state.value} → {next_state.value} (tag: {tag})")
-                
-                # Guardar nombre de herramienta para cuando el bloque esté completo
-                if next_state == StreamState.IN_TOOL:
-                    # Extraer nombre de herramienta del tag
-                    self.current_tool_name = tag.replace('<tool_', '').replace('>', '')
-                    # NO mostramos el indicador aquí, esperamos a tener los parámetros
-                
-                # Procesar inmediatamente el nuevo estado
-                self.feed_token("")
-                return
+        # Buscar el primer tag de apertura del buffer (puede haber varios si
+        # se alimentó un fragmento grande)
+        first_tag = None
+        first_pos = -1
+        for tag in self.opening_tags:
+            pos = self.buffer.find(tag)
+            if pos != -1 and (first_pos == -1 or pos < first_pos):
+                first_tag, first_pos = tag, pos
+        
+        if first_tag is not None:
+            # Encontrado tag completo
+            tag, next_state = first_tag, self.opening_tags[first_tag]
+            before_tag = self.buffer[:first_pos]
+            after_tag = self.buffer[first_pos + len(tag):]
+            
+            # Limpiar marcadores de código markdown antes del tag
+            before_tag_clean = before_tag.rstrip()
+            if before_tag_clean.endswith('```xml'):
+                before_tag_clean = before_tag_clean[:-6].rstrip()
+            elif before_tag_clean.endswith('```'):
+                before_tag_clean = before_tag_clean[:-3].rstrip()
+            elif before_tag_clean.endswith('xml'):
+                before_tag_clean = before_tag_clean[:-3].rstrip()
+            
+            # Liberar texto antes del tag (si hay)
+            if before_tag_clean.strip():
+                self.display.stream_plain_text(before_tag_clean)
+            
+            # Cambiar de estado
+            old_state = self.state
+            self.state = next_state
+            self.buffer = after_tag
+            
+            self.logger.debug(f"Transición: {old_state.value} → {next_state.value} (tag: {tag})")
+            
+            # Guardar nombre de herramienta para cuando el bloque esté completo
+            if next_state == StreamState.IN_TOOL:
+                # Extraer nombre de herramienta del tag
+                self.current_tool_name = tag.replace('<tool_', '').replace('>', '')
+                # NO mostramos el indicador aquí, esperamos a tener los parámetros
+            
+            # Procesar inmediatamente el nuevo estado
+            self.feed_token("")
+            return
         
         # No se encontró ningún tag completo
         # Si el buffer contiene '<', podría ser inicio de tag
@@ -432,8 +460,9 @@ class StreamingStateMachine:
         """
         Preprocesa un token para eliminar saltos de línea consecutivos
         
-        Estrategia: Acumula caracteres en un buffer temporal y solo libera
-        cuando está seguro de que no hay más saltos de línea consecutivos.
+        Estrategia: Retiene los saltos de línea finales del token y solo los
+        libera cuando llega un carácter distinto, por si el siguiente token
+        continúa la secuencia.
         
         Convierte secuencias de \n\n (o más) en un solo \n
         
@@ -443,33 +472,16 @@ class StreamingStateMachine:
         Returns:
             Token procesado (puede ser vacío si aún está acumulando)
         """
-        processed = ""
-        
-        for char in token:
-            if char == '\n':
-                # Acumular newlines
-                self._newline_buffer += char
-            else:
-                # Carácter no-newline: procesar buffer de newlines acumulado
-                if self._newline_buffer:
-                    # Contar cuántos \n hay acumulados
-                    newline_count = len(self._newline_buffer)
-                    
-                    if newline_count >= 2:
-                        # Dos o más \n consecutivos -> reducir a uno solo
-                        processed += '\n'
-                    elif newline_count == 1:
-                        # Un solo \n -> mantenerlo
-                        processed += '\n'
-                    
-                    # Limpiar buffer
-                    self._newline_buffer = ""
-                
-                # Agregar el carácter no-newline
-                processed += char
+        text = self._newline_buffer + token
+        stripped = text.rstrip('\n')
         
-        return processed
-
+        # Un solo \n pendiente basta: cualquier secuencia se reduce a uno
+        self._newline_buffer = '\n' if len(stripped) != len(text) else ""
+        
+        if not stripped:
+            return ""
+        
+        return _NEWLINE_RUN_RE.sub('\n', stripped)
 
 def main():
     """Función principal para testing"""
@@ -306,8 +306,9 @@ class ToolExecutor:
                     formatted += f"\n{i}. Archivo: {fragment.get('file_name', 'N/A')}\n"
                     if 'score' in fragment:
                         formatted += f"   Score: {fragment['score']:.4f}\n"
-                    content = fragment.get('content', '')[:200]
-                    formatted += f"   Contenido: {content}...\n"
+                    content = fragment.get('content') or ''
+                    preview = content[:200] + "..." if len(content) > 200 else content
+                    formatted += f"   Contenido: {preview}\n"
             
             return formatted
         
@@ -7,7 +7,7 @@ Este módulo contiene utilidades compartidas por todas las herramientas:
 - BedrockClient: Cliente singleton para AWS Bedrock
 - Logger: Configuración de logging
 - Decoradores: handle_search_error, log_search_metrics, validate_parameters
-- Utilidades: calculate_text_similarity, find_overlap_length, remove_duplicate_chunks_by_hash
+- Utilidades: calculate_text_similarity, find_overlap_length, remove_duplicate_chunks_by_hash, print_json
 - SimpleCache: Cache en memoria con TTL
 """
 
@@ -25,6 +25,7 @@ from .common import (
     calculate_text_similarity,
     find_overlap_length,
     remove_duplicate_chunks_by_hash,
+    print_json,
     SimpleCache,
     get_cache
 )
@@ -43,6 +44,7 @@ __all__ = [
     'calculate_text_similarity',
     'find_overlap_length',
     'remove_duplicate_chunks_by_hash',
+    'print_json',
     'SimpleCache',
     'get_cache'
 ]
@@ -8,12 +8,21 @@ import boto3
 import json
 import hashlib
 import time
+import copy
+import operator
 from typing import Dict, List, Any, Optional
 from opensearchpy import OpenSearch
-from functools import wraps
+from functools import wraps, lru_cache
 import os
+import sys
 import warnings
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Suprimir warnings de SSL de opensearchpy
 warnings.filterwarnings('ignore', message='Connecting to .* using SSL with verify_certs=False is insecure.')
 
@@ -21,6 +30,15 @@ warnings.filterwarnings('ignore', message='Connecting to .* using SSL with verif
 warnings.filterwarnings('ignore', category=DeprecationWarning, module='boto3')
 warnings.filterwarnings('ignore', message='Boto3 will no longer support Python.*')
 
+# Loader YAML en C (libyaml) si está disponible, mucho más rápido que el puro Python
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime: float) -> Dict[str, Any]:
+    """Parsea un YAML una sola vez por (ruta, mtime) y proceso"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=_YAML_LOADER)
+
 class Config:
     """Clase para manejar la configuración desde el archivo YAML"""
     
@@ -29,10 +47,11 @@ class Config:
         self.config = self._load_config()
     
     def _load_config(self) -> Dict[str, Any]:
-        """Carga la configuración desde el archivo YAML"""
+        """Carga la configuración desde el archivo YAML (cacheada por mtime)"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as file:
-                return yaml.safe_load(file)
+            mtime = os.path.getmtime(self.config_path)
+            # deepcopy para que ninguna instancia pueda mutar la copia cacheada
+            return copy.deepcopy(_load_yaml_cached(self.config_path, mtime))
         except FileNotFoundError:
             raise FileNotFoundError(f"Archivo de configuración no encontrado: {self.config_path}")
         except yaml.YAMLError as e:
@@ -170,13 +189,27 @@ class BedrockClient:
         if self._client is None:
             self._config = config
             self._client = self._create_client()
+            self._model_id = config.get('bedrock.model_id')
+            
+            # El cuerpo de la petición siempre tiene la misma forma: se precodifica
+            # todo salvo el texto, que se serializa (y escapa) en cada llamada
+            dimensions = json.dumps(config.get('bedrock.embedding_dimensions'))
+            self._body_prefix = b'{"inputText":'
+            self._body_suffix = (',"embeddingConfig":{"outputEmbeddingLength":%s}}' % dimensions).encode('utf-8')
     
     def _create_client(self):
-        """Crea el cliente de Bedrock"""
+        """Crea el cliente de Bedrock con un pool de conexiones reutilizable"""
         try:
+            from botocore.config import Config as BotoConfig
+            
             return boto3.client(
                 'bedrock-runtime',
-                region_name=self._config.get('bedrock.region_name')
+                region_name=self._config.get('bedrock.region_name'),
+                config=BotoConfig(
+                    max_pool_connections=self._config.get('bedrock.max_pool_connections', 32),
+                    retries={'max_attempts': 3, 'mode': 'adaptive'},
+                    tcp_keepalive=True
+                )
             )
         except Exception as e:
             raise ConnectionError(f"Error al conectar con Bedrock: {str(e)}")
@@ -188,17 +221,16 @@ class BedrockClient:
     def generate_embedding(self, text: str) -> List[float]:
         """Genera embedding para un texto"""
         try:
+            text_bytes = orjson.dumps(text) if ORJSON_AVAILABLE else json.dumps(text).encode('utf-8')
+            
+            # orjson (si está instalado) parsea el array de 1024 floats mucho más rápido
             response = self._client.invoke_model(
-                modelId=self._config.get('bedrock.model_id'),
-                body=json.dumps({
-                    "inputText": text,
-                    "embeddingConfig": {
-                        "outputEmbeddingLength": self._config.get('bedrock.embedding_dimensions')
-                    }
-                })
+                modelId=self._model_id,
+                body=self._body_prefix + text_bytes + self._body_suffix
             )
             
-            result = json.loads(response['body'].read())
+            raw_body = response['body'].read()
+            result = orjson.loads(raw_body) if ORJSON_AVAILABLE else json.loads(raw_body)
             return result['embedding']
             
         except Exception as e:
@@ -351,22 +383,60 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     if min_len == 0:
         return 0.0
     
-    matches = sum(1 for i in range(min_len) if norm1[i] == norm2[i])
+    # zip se detiene en el texto más corto: compara las min_len posiciones en C
+    matches = sum(map(operator.eq, norm1, norm2))
     return matches / min_len
 
+def _normalized_prefix_lengths(text: str) -> List[int]:
+    """
+    Longitud de ' '.join(text[:n].split()) para cada n de 0 a len(text),
+    calculada en un solo recorrido
+    """
+    lengths = [0]
+    length = 0
+    in_word = False
+    for char in text:
+        if char.isspace():
+            in_word = False
+        elif in_word:
+            length += 1
+        else:
+            # Nueva palabra: un espacio de separación si no es la primera
+            length += 2 if length else 1
+            in_word = True
+        lengths.append(length)
+    return lengths
+
+# Longitud máxima de overlap que se busca entre chunks consecutivos
+MAX_OVERLAP_LENGTH = 500
+
 def find_overlap_length(text1: str, text2: str, min_overlap: int = 50) -> int:
     """
     Encuentra la longitud del overlap entre el final de text1 y el inicio de text2.
+    Solo se examinan los últimos MAX_OVERLAP_LENGTH caracteres de text1.
     """
-    max_overlap = min(len(text1), len(text2), 500)  # Limitar búsqueda a 500 chars
+    max_overlap = min(len(text1), len(text2), MAX_OVERLAP_LENGTH)
+    
+    # El texto normalizado de un sufijo de text1 (o de un prefijo de text2) es
+    # un sufijo (o prefijo) del de la ventana completa: normalizar una vez y
+    # comparar cortes, con la misma similitud que calculate_text_similarity
+    tail = text1[len(text1) - max_overlap:]
+    head = text2[:max_overlap]
+    norm_tail = ' '.join(tail.split())
+    norm_head = ' '.join(head.split())
+    tail_lengths = _normalized_prefix_lengths(tail[::-1])
+    head_lengths = _normalized_prefix_lengths(head)
     
     for overlap_len in range(max_overlap, min_overlap - 1, -1):
         # Comparar final de text1 con inicio de text2
-        end_of_text1 = text1[-overlap_len:]
-        start_of_text2 = text2[:overlap_len]
+        len1 = tail_lengths[overlap_len]
+        len2 = head_lengths[overlap_len]
+        if not len1 or not len2:
+            continue
         
         # Calcular similitud (permitir pequeñas diferencias por espacios/saltos)
-        similarity = calculate_text_similarity(end_of_text1, start_of_text2)
+        matches = sum(map(operator.eq, norm_tail[len(norm_tail) - len1:], norm_head[:len2]))
+        similarity = matches / min(len1, len2)
         
         if similarity > 0.85:  # 85% de similitud
             return overlap_len
@@ -388,6 +458,27 @@ def remove_duplicate_chunks_by_hash(chunks: List[Dict]) -> List[Dict]:
     
     return unique_chunks
 
+def make_cache_key(prefix: str, *parts: Any) -> str:
+    """
+    Construye una clave de cache estable entre procesos.
+    
+    hash() de un str se aleatoriza en cada proceso (PYTHONHASHSEED), así que
+    la misma búsqueda generaría claves distintas en cada worker; el digest
+    BLAKE2b del repr de las partes es siempre el mismo.
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{prefix}:{digest}"
+
+def print_json(data: Any):
+    """Imprime datos como JSON indentado en stdout (orjson si está disponible)"""
+    if ORJSON_AVAILABLE:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+
 class SimpleCache:
     """Cache simple en memoria con TTL"""
     
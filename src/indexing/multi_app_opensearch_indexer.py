@@ -93,6 +93,10 @@ class MultiAppOpenSearchIndexer:
             table_max_rows_per_chunk=self.table_max_rows_per_chunk
         )
         
+        # Vector clause of the hybrid search ('auto' is resolved lazily from
+        # the index mapping, see _resolve_vector_query)
+        self._vector_query: Optional[str] = None
+        
         logger.info(f"MultiAppOpenSearchIndexer initialized for {self.application_info['name']} - Index: {self.index_name}")
         
     def create_index(self) -> bool:
@@ -127,7 +131,13 @@ class MultiAppOpenSearchIndexer:
                         },
                         "embedding": {
                             "type": "knn_vector",
-                            "dimension": 1024
+                            "dimension": 1024,
+                            # Cosine space: the k-NN score is (1 + cos) / 2, the
+                            # scale the hybrid query's similarity_threshold assumes
+                            "method": {
+                                "name": "hnsw",
+                                "space_type": "cosinesimil"
+                            }
                         },
                         "image_base64": {
                             "type": "text",
@@ -510,22 +520,17 @@ class MultiAppOpenSearchIndexer:
                                 }
                             },
                             # Vector search
-                            {
-                                "script_score": {
-                                    "query": {"match_all": {}},
-                                    "script": {
-                                        "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
-                                        "params": {"query_vector": query_embedding}
-                                    },
-                                    "boost": 2.0
-                                }
-                            }
+                            self._build_vector_clause(query_embedding, size, search_config)
                         ],
                         "minimum_should_match": 1
                     }
                 },
+                # Only transfer the fields read below (never embeddings)
                 "_source": {
-                    "excludes": ["embedding"]  # Don't return embeddings in results
+                    "includes": [
+                        "content", "file_name", "file_path", "chunk_index", "metadata",
+                        "application_id", "application_name", "image_base64", "has_images"
+                    ]
                 }
             }
             
@@ -559,6 +564,87 @@ class MultiAppOpenSearchIndexer:
             logger.error(f"Error searching documents in {self.app_name}: {e}")
             return []
     
+    def _resolve_vector_query(self, search_config: Dict[str, Any]) -> str:
+        """
+        Decide which vector clause the hybrid search uses.
+        
+        ``vector_query`` is read from the RAG ``search`` section or, failing
+        that, from the application's ``opensearch`` section:
+        
+        - ``script_score``: exhaustive Painless cosine scan (works on any index)
+        - ``knn``: native k-NN query (requires a cosinesimil ``embedding`` field)
+        - ``auto`` (default): read the index mapping once and use ``knn`` only
+          when the ``embedding`` field declares ``space_type: cosinesimil``
+        
+        Indices created with the baseline mapping declare no ``method``, so
+        the engine default space (l2 on most versions) applies and ``auto``
+        keeps them on ``script_score``, where ``similarity_threshold`` keeps
+        its meaning.
+        """
+        if self._vector_query is not None:
+            return self._vector_query
+        
+        vector_query = search_config.get(
+            'vector_query', self.app_config.get('opensearch', {}).get('vector_query', 'auto')
+        )
+        
+        if vector_query == 'auto':
+            vector_query = 'script_score'
+            try:
+                mapping = self.opensearch_client.indices.get_mapping(index=self.index_name)
+                for index_mapping in mapping.values():
+                    embedding = index_mapping['mappings']['properties'].get('embedding', {})
+                    if embedding.get('method', {}).get('space_type') == 'cosinesimil':
+                        vector_query = 'knn'
+            except Exception as e:
+                logger.warning(f"Could not read the mapping of {self.index_name}, using script_score: {e}")
+            logger.info(f"Hybrid search vector clause for {self.index_name}: {vector_query}")
+        
+        self._vector_query = vector_query
+        return vector_query
+    
+    def _build_vector_clause(self, query_embedding: List[float], size: int,
+                             search_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the vector clause of the hybrid query.
+        
+        Uses the native k-NN query against the HNSW graph of the ``embedding``
+        field or the exhaustive Painless cosine similarity scan, as decided by
+        ``_resolve_vector_query``. Both variants contribute the same amount to
+        ``_score``: the script_score clause adds ``2 * (cos + 1)`` and the
+        cosinesimil k-NN score ``(1 + cos) / 2`` is boosted by 4, so
+        ``similarity_threshold`` means the same on both paths.
+        
+        Args:
+            query_embedding: Query embedding vector
+            size: Number of results requested
+            search_config: Application-specific search configuration
+            
+        Returns:
+            Query clause to place in the ``should`` list
+        """
+        if self._resolve_vector_query(search_config) == 'script_score':
+            return {
+                "script_score": {
+                    "query": {"match_all": {}},
+                    "script": {
+                        "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
+                        "params": {"query_vector": query_embedding}
+                    },
+                    "boost": 2.0
+                }
+            }
+        
+        return {
+            "knn": {
+                "embedding": {
+                    "vector": query_embedding,
+                    "k": size,
+                    "boost": 4.0
+                }
+            }
+        }
+    
     def get_index_stats(self) -> Dict:
         """Get statistics about the application-specific index"""
         try:
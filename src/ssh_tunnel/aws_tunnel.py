@@ -7,11 +7,11 @@ Permite acceso local a recursos en VPC privada a través de Session Manager.
 import argparse
 import subprocess
 import sys
-import time
 import json
+import threading
 import boto3
 from botocore.exceptions import ClientError
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 
 class AWSSSMTunnel:
     """Clase para gestionar túneles SSH a través de AWS SSM"""
@@ -31,11 +31,14 @@ class AWSSSMTunnel:
                 ]
             )
             
+            # Obtener en una sola llamada (paginada) todas las instancias gestionadas por SSM
+            ssm_instance_ids = self.get_ssm_managed_instance_ids()
+            
             instances = []
             for reservation in response['Reservations']:
                 for instance in reservation['Instances']:
                     # Verificar si tiene SSM Agent
-                    ssm_status = self.check_ssm_status(instance['InstanceId'])
+                    ssm_status = instance['InstanceId'] in ssm_instance_ids
                     if ssm_status:
                         instances.append({
                             'instance_id': instance['InstanceId'],
@@ -59,6 +62,19 @@ class AWSSSMTunnel:
                 return tag['Value']
         return instance['InstanceId']
     
+    def get_ssm_managed_instance_ids(self) -> Set[str]:
+        """Obtiene los IDs de todas las instancias con SSM Agent registrado"""
+        try:
+            paginator = self.ssm_client.get_paginator('describe_instance_information')
+            return {
+                info['InstanceId']
+                for page in paginator.paginate()
+                for info in page['InstanceInformationList']
+            }
+        except ClientError as e:
+            print(f"Error consultando instancias SSM: {e}")
+            return set()
+    
     def check_ssm_status(self, instance_id: str) -> bool:
         """Verifica si una instancia tiene SSM Agent activo"""
         try:
@@ -75,26 +91,48 @@ class AWSSSMTunnel:
                                   remote_host: str, remote_port: int,
                                   local_port: int = 9201) -> Optional[str]:
         """Crea una sesión de port forwarding usando SSM"""
+        # Parámetros para el port forwarding
+        parameters = {
+            'portNumber': [str(remote_port)],
+            'localPortNumber': [str(local_port)],
+            'host': [remote_host]
+        }
+        
+        # Lanzar la sesión con la CLI para que session-manager-plugin abra el
+        # puerto local; el proceso vive mientras el túnel esté activo
         try:
-            # Parámetros para el port forwarding
-            parameters = {
-                'portNumber': [str(remote_port)],
-                'localPortNumber': [str(local_port)],
-                'host': [remote_host]
-            }
-            
-            # Crear sesión SSM
-            response = self.ssm_client.start_session(
-                Target=instance_id,
-                DocumentName='AWS-StartPortForwardingSessionToRemoteHost',
-                Parameters=parameters
+            self._tunnel_proc = subprocess.Popen(
+                ['aws', 'ssm', 'start-session',
+                 '--region', self.region,
+                 '--target', instance_id,
+                 '--document-name', 'AWS-StartPortForwardingSessionToRemoteHost',
+                 '--parameters', json.dumps(parameters)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True
             )
-            
-            return response['SessionId']
-            
-        except ClientError as e:
-            print(f"Error creando sesión SSM: {e}")
+        except FileNotFoundError as e:
+            print(f"Error creando sesión SSM: AWS CLI no encontrada ({e})")
             return None
+        
+        # La CLI imprime "Starting session with SessionId: <id>" al arrancar
+        output = []
+        for line in self._tunnel_proc.stdout:
+            output.append(line)
+            if 'SessionId:' in line:
+                session_id = line.split('SessionId:', 1)[1].strip()
+                # Drenar el resto de la salida para que el proceso nunca se bloquee
+                threading.Thread(target=self._drain_tunnel_output, daemon=True).start()
+                return session_id
+        
+        self._tunnel_proc.wait()
+        print(f"Error creando sesión SSM: {''.join(output).strip()}")
+        return None
+    
+    def _drain_tunnel_output(self):
+        """Consume la salida del proceso del túnel hasta que termine"""
+        for _ in self._tunnel_proc.stdout:
+            pass
     
     def setup_opensearch_tunnel(self, opensearch_host: str, 
                                local_port: int = 9201) -> bool:
@@ -147,25 +185,16 @@ class AWSSSMTunnel:
         """Mantiene el túnel activo esperando señal de terminación"""
         print(f"\n⏳ Túnel activo. Presiona Ctrl+C para terminar...")
         try:
-            # Mantener el proceso corriendo indefinidamente
-            while True:
-                time.sleep(60)
-                # Verificar que la sesión sigue activa
-                try:
-                    response = self.ssm_client.describe_sessions(
-                        State='Active',
-                        Filters=[
-                            {'key': 'SessionId', 'value': self.session_id}
-                        ]
-                    )
-                    if not response['Sessions']:
-                        print("\n⚠️  La sesión SSM se cerró inesperadamente")
-                        break
-                except Exception as e:
-                    print(f"\n⚠️  Error verificando sesión: {e}")
-                    break
+            # Bloquear hasta que el proceso del túnel termine (sin polling)
+            return_code = self._tunnel_proc.wait()
+            print(f"\n⚠️  La sesión SSM se cerró inesperadamente (código {return_code})")
         except KeyboardInterrupt:
             print("\n\n🛑 Terminando túnel...")
+            self._tunnel_proc.terminate()
+            try:
+                self._tunnel_proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._tunnel_proc.kill()
             try:
                 self.ssm_client.terminate_session(SessionId=self.session_id)
                 print("✅ Túnel terminado correctamente")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas por los scripts de prueba que miden tiempos (--repeat)
+"""
+
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+
+def measure_repeated(func: Callable[[], object], repeat: int) -> Tuple[List[int], List[int]]:
+    """
+    Ejecuta func repeat veces y mide cada llamada.
+
+    Returns:
+        Tupla (tiempos reales, tiempos de CPU) en nanosegundos
+    """
+    wall_times = []
+    cpu_times = []
+    for _ in range(repeat):
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.process_time_ns()
+        func()
+        cpu_times.append(time.process_time_ns() - cpu_start)
+        wall_times.append(time.perf_counter_ns() - wall_start)
+    return wall_times, cpu_times
+
+
+def print_timings(wall_times: List[int], cpu_times: List[int]):
+    """Imprime mediana y p95 del tiempo real y del tiempo de CPU"""
+    for label, times in (("Tiempo real", wall_times), ("Tiempo CPU", cpu_times)):
+        p95 = sorted(times)[min(len(times) - 1, int(0.95 * len(times)))]
+        print(f"{label}: mediana {statistics.median(times) / 1e6:.1f}ms, p95 {p95 / 1e6:.1f}ms")
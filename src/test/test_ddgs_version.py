@@ -5,9 +5,11 @@ Script para diagnosticar problemas con duckduckgo-search
 
 import sys
 
-print("=" * 80)
+H80 = "=" * 80
+
+print(H80)
 print("DIAGNÓSTICO DE DUCKDUCKGO-SEARCH")
-print("=" * 80)
+print(H80)
 
 # 1. Verificar si está instalado
 try:
@@ -62,6 +64,6 @@ try:
 except ImportError as e:
     print(f"❌ No se pudo importar DDGS: {e}")
 
-print("\n" + "=" * 80)
+print("\n" + H80)
 print("FIN DEL DIAGNÓSTICO")
-print("=" * 80)
+print(H80)
@@ -7,21 +7,134 @@ Permite probar la extracción de estructura de PDFs.
 import sys
 import os
 import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # Agregar el directorio raíz al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.tools.document_structure_analyzer import DocumentStructureAnalyzer
+from src.tools.document_structure_analyzer import DocumentStructureAnalyzer, DocumentStructure
+from benchmark_utils import measure_repeated, print_timings
 import logging
 
+H80 = "=" * 80
+D80 = "-" * 80
 
-def test_pdf_structure(pdf_path: str):
+
+def _prewarm_file(path: str):
+    """Lee el archivo por bloques para dejarlo en la page cache del sistema"""
+    try:
+        with open(path, 'rb') as f:
+            while f.read(1 << 20):
+                pass
+    except OSError:
+        pass
+
+
+def _load_cached_structure(pdf_path: str, output_file: str):
+    """
+    Carga la estructura desde el JSON generado en una ejecución anterior si el
+    PDF no ha cambiado desde entonces (mismo tamaño y mtime).
+    
+    Returns:
+        DocumentStructure cacheada o None si no es válida
+    """
+    if not os.path.exists(output_file):
+        return None
+    
+    stat = os.stat(pdf_path)
+    if os.path.getmtime(output_file) < stat.st_mtime:
+        return None
+    
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    meta = data.get("_meta", {})
+    if meta.get("src_mtime") != stat.st_mtime or meta.get("src_size") != stat.st_size:
+        return None
+    
+    return DocumentStructure.from_dict(data)
+
+
+def _save_structure(pdf_path: str, structure: DocumentStructure, output_file: str):
+    """Guarda la estructura en JSON junto con los datos del PDF para validar el cache"""
+    stat = os.stat(pdf_path)
+    meta = {"_meta": {"src_mtime": stat.st_mtime, "src_size": stat.st_size}}
+    with open(output_file, 'w', encoding='utf-8') as f:
+        structure.write_json(f, extra=meta)
+
+
+def _analyze_one(pdf_path: str, use_cache: bool = True):
+    """
+    Analiza un PDF en un proceso worker y guarda su JSON allí mismo, de modo
+    que solo viaja de vuelta un resumen y no la estructura completa.
+    
+    Returns:
+        Tupla (ruta, número de secciones o None, error o None)
+    """
+    output_file = f"{pdf_path}.structure.json"
+    try:
+        structure = _load_cached_structure(pdf_path, output_file) if use_cache else None
+        if structure is None:
+            structure = DocumentStructureAnalyzer().analyze(pdf_path, use_cache=use_cache)
+            _save_structure(pdf_path, structure, output_file)
+        return pdf_path, len(structure.sections), None
+    except Exception as e:
+        return pdf_path, None, str(e)
+
+
+def run_pdf_directory(directory: str, use_cache: bool = True) -> bool:
+    """
+    Analiza en paralelo todos los PDFs de un directorio (recursivo).
+    
+    El parseo de PDFs es CPU-bound e independiente por archivo, así que se
+    reparte en un pool de procesos del tamaño del número de CPUs.
+    
+    Args:
+        directory: Directorio con los PDFs a analizar
+        use_cache: Si True, reutiliza los JSON de los PDFs que no cambiaron
+    """
+    print("\n" + H80)
+    print("TEST: ANÁLISIS DE ESTRUCTURA DE DIRECTORIO")
+    print(H80)
+    
+    pdf_paths = sorted(str(p) for p in Path(directory).rglob('*.pdf'))
+    if not pdf_paths:
+        print(f"⚠️  No se encontraron PDFs en: {directory}")
+        return False
+    
+    workers = os.cpu_count() or 1
+    print(f"\n📂 Analizando {len(pdf_paths)} PDFs con {workers} procesos...")
+    print(D80)
+    
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for pdf_path, section_count, error in executor.map(partial(_analyze_one, use_cache=use_cache), pdf_paths, chunksize=4):
+            if error:
+                failures += 1
+                print(f"❌ {pdf_path}: {error}")
+            else:
+                print(f"✅ {pdf_path}: {section_count} secciones")
+    
+    print("\n" + H80)
+    print(f"Completados: {len(pdf_paths) - failures}/{len(pdf_paths)}")
+    print(H80 + "\n")
+    
+    return failures == 0
+
+
+def test_pdf_structure(pdf_path: str, use_cache: bool = True):
     """
     Prueba el análisis de estructura de un PDF específico.
     
     Args:
         pdf_path: Ruta al archivo PDF a analizar
+        use_cache: Reutilizar el JSON de una ejecución anterior si el PDF no cambió
     """
     # Configurar logging
     logging.basicConfig(
@@ -31,9 +144,9 @@ def test_pdf_structure(pdf_path: str):
     
     logger = logging.getLogger(__name__)
     
-    print("\n" + "=" * 80)
+    print("\n" + H80)
     print("TEST: ANÁLISIS DE ESTRUCTURA DE DOCUMENTO")
-    print("=" * 80)
+    print(H80)
     
     # Verificar que el archivo existe
     if not os.path.exists(pdf_path):
@@ -41,86 +154,105 @@ def test_pdf_structure(pdf_path: str):
         return False
     
     print(f"\n📄 Analizando: {pdf_path}")
-    print("-" * 80)
+    print(D80)
+    
+    output_file = f"{pdf_path}.structure.json"
     
     try:
-        # Crear analizador
-        analyzer = DocumentStructureAnalyzer()
+        structure = _load_cached_structure(pdf_path, output_file) if use_cache else None
         
-        # Analizar documento
-        print("\n⏳ Extrayendo estructura del documento...")
-        structure = analyzer.analyze(pdf_path)
+        if structure is not None:
+            print(f"\n♻️  Estructura cargada desde cache: {output_file}")
+        else:
+            # Precargar el PDF en segundo plano mientras se crea el analizador
+            threading.Thread(target=_prewarm_file, args=(pdf_path,), daemon=True).start()
+            
+            # Crear analizador
+            analyzer = DocumentStructureAnalyzer()
+            
+            # Analizar documento
+            print("\n⏳ Extrayendo estructura del documento...")
+            structure = analyzer.analyze(pdf_path, use_cache=use_cache)
         
         # Mostrar resultados
-        print("\n✅ Análisis completado exitosamente!")
-        print("\n" + "=" * 80)
-        print("INFORMACIÓN DEL DOCUMENTO")
-        print("=" * 80)
-        print(f"Nombre: {structure.file_name}")
-        print(f"Tipo: {structure.file_type}")
-        print(f"Páginas totales: {structure.total_pages}")
-        print(f"Caracteres totales: {structure.total_chars:,}")
-        print(f"Método de extracción: {structure.extraction_method}")
-        print(f"Secciones encontradas: {len(structure.sections)}")
+        sys.stdout.write(
+            "\n✅ Análisis completado exitosamente!\n"
+            "\n" + H80 + "\n"
+            "INFORMACIÓN DEL DOCUMENTO\n"
+            + H80 + "\n"
+            f"Nombre: {structure.file_name}\n"
+            f"Tipo: {structure.file_type}\n"
+            f"Páginas totales: {structure.total_pages}\n"
+            f"Caracteres totales: {structure.total_chars:,}\n"
+            f"Método de extracción: {structure.extraction_method}\n"
+            f"Secciones encontradas: {len(structure.sections)}\n"
+        )
         
         # Mostrar tabla de contenidos
-        print("\n" + "=" * 80)
+        print("\n" + H80)
         print("TABLA DE CONTENIDOS")
-        print("=" * 80)
+        print(H80)
         
         if structure.sections:
+            # Acumular la tabla completa y escribirla de una vez: con miles de
+            # secciones, un print() por línea supone miles de escrituras
+            lines = []
             for section in structure.sections:
                 indent = "  " * (section.level - 1)
-                print(f"\n{indent}📌 {section.id}: {section.title}")
-                print(f"{indent}   ├─ Nivel: {section.level}")
-                print(f"{indent}   ├─ Páginas: {section.start_page} - {section.end_page}")
+                lines.append(f"\n{indent}📌 {section.id}: {section.title}\n")
+                lines.append(f"{indent}   ├─ Nivel: {section.level}\n")
+                lines.append(f"{indent}   ├─ Páginas: {section.start_page} - {section.end_page}\n")
                 if section.char_count:
-                    print(f"{indent}   ├─ Caracteres: {section.char_count:,}")
+                    lines.append(f"{indent}   ├─ Caracteres: {section.char_count:,}\n")
                 if section.parent_id:
-                    print(f"{indent}   └─ Padre: {section.parent_id}")
+                    lines.append(f"{indent}   └─ Padre: {section.parent_id}\n")
+            sys.stdout.write("".join(lines))
         else:
             print("⚠️  No se encontraron secciones en el documento")
         
-        # Guardar estructura en JSON
-        output_file = f"{pdf_path}.structure.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(structure.to_dict(), f, indent=2, ensure_ascii=False)
+        # Guardar estructura en JSON (con los datos del PDF para validar el cache)
+        _save_structure(pdf_path, structure, output_file)
         
-        print("\n" + "=" * 80)
+        print("\n" + H80)
         print(f"💾 Estructura guardada en: {output_file}")
-        print("=" * 80)
+        print(H80)
         
         # Mostrar estadísticas adicionales
-        print("\n" + "=" * 80)
+        print("\n" + H80)
         print("ESTADÍSTICAS")
-        print("=" * 80)
+        print(H80)
         
         if structure.sections:
-            # Calcular estadísticas
-            avg_chars = sum(s.char_count or 0 for s in structure.sections) / len(structure.sections)
-            max_section = max(structure.sections, key=lambda s: s.char_count or 0)
-            min_section = min(structure.sections, key=lambda s: s.char_count or 0)
+            # Calcular estadísticas en una sola pasada sobre las secciones
+            total_chars = 0
+            max_section = min_section = None
+            max_chars = min_chars = 0
+            levels = {}
+            for section in structure.sections:
+                chars = section.char_count or 0
+                total_chars += chars
+                if max_section is None or chars > max_chars:
+                    max_section, max_chars = section, chars
+                if min_section is None or chars < min_chars:
+                    min_section, min_chars = section, chars
+                levels[section.level] = levels.get(section.level, 0) + 1
+            avg_chars = total_chars / len(structure.sections)
             
             print(f"Promedio de caracteres por sección: {avg_chars:,.0f}")
             print(f"\nSección más grande:")
             print(f"  • {max_section.title}")
-            print(f"  • Caracteres: {max_section.char_count:,}")
+            print(f"  • Caracteres: {max_chars:,}")
             print(f"\nSección más pequeña:")
             print(f"  • {min_section.title}")
-            print(f"  • Caracteres: {min_section.char_count:,}")
-            
-            # Distribución por niveles
-            levels = {}
-            for section in structure.sections:
-                levels[section.level] = levels.get(section.level, 0) + 1
+            print(f"  • Caracteres: {min_chars:,}")
             
             print(f"\nDistribución por niveles:")
             for level in sorted(levels.keys()):
                 print(f"  • Nivel {level}: {levels[level]} secciones")
         
-        print("\n" + "=" * 80)
+        print("\n" + H80)
         print("✅ TEST COMPLETADO EXITOSAMENTE")
-        print("=" * 80 + "\n")
+        print(H80 + "\n")
         
         return True
         
@@ -131,12 +263,41 @@ def test_pdf_structure(pdf_path: str):
         return False
 
 
+def benchmark_pdf_structure(pdf_path: str, repeat: int) -> bool:
+    """
+    Mide el tiempo de analyzer.analyze() repitiéndolo varias veces.
+    
+    Reporta mediana y p95 del tiempo real y del tiempo de CPU; si ambos son
+    parecidos el análisis es CPU-bound, si el real es mucho mayor domina la E/S.
+    
+    Args:
+        pdf_path: Ruta al archivo PDF a analizar
+        repeat: Número de repeticiones
+    """
+    if not os.path.exists(pdf_path):
+        print(f"❌ Error: El archivo no existe: {pdf_path}")
+        return False
+    
+    analyzer = DocumentStructureAnalyzer()
+    wall_times, cpu_times = measure_repeated(
+        lambda: analyzer.analyze(pdf_path, use_cache=False), repeat
+    )
+    
+    print("\n" + H80)
+    print(f"BENCHMARK: analyze() x{repeat} - {pdf_path}")
+    print(H80)
+    print_timings(wall_times, cpu_times)
+    print(H80 + "\n")
+    
+    return True
+
+
 def main():
     """Función principal"""
     if len(sys.argv) < 2:
-        print("\n" + "=" * 80)
-        print("USO: python3 test_document_structure.py <ruta_al_pdf>")
-        print("=" * 80)
+        print("\n" + H80)
+        print("USO: python3 test_document_structure.py <ruta_al_pdf | directorio> [--no-cache] [--repeat N]")
+        print(H80)
         print("\nEjemplo:")
         print("  python3 src/test/test_document_structure.py /ruta/a/documento.pdf")
         print("\nEste script:")
@@ -144,11 +305,21 @@ def main():
         print("  2. Extrae secciones y tabla de contenidos")
         print("  3. Muestra estadísticas del documento")
         print("  4. Guarda la estructura en formato JSON")
-        print("=" * 80 + "\n")
+        print("  5. Reutiliza ese JSON si el PDF no cambió (--no-cache para forzar)")
+        print("\nCon un directorio, analiza todos sus PDFs en paralelo")
+        print("Con --repeat N, mide el tiempo de N análisis (mediana y p95)")
+        print(H80 + "\n")
         sys.exit(1)
     
     pdf_path = sys.argv[1]
-    success = test_pdf_structure(pdf_path)
+    use_cache = "--no-cache" not in sys.argv[2:]
+    if "--repeat" in sys.argv[2:]:
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+        success = benchmark_pdf_structure(pdf_path, repeat)
+    elif os.path.isdir(pdf_path):
+        success = run_pdf_directory(pdf_path, use_cache=use_cache)
+    else:
+        success = test_pdf_structure(pdf_path, use_cache=use_cache)
     
     sys.exit(0 if success else 1)
 
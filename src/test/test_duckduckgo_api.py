@@ -1,6 +1,112 @@
+import asyncio
+import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from urllib.parse import quote
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional; it is a C parser and much faster than html.parser
+try:
+    import lxml  # noqa: F401
+    _PARSER = 'lxml'
+except ImportError:
+    _PARSER = 'html.parser'
+
+# Only build the result divs, the rest of the page is never needed
+_RESULTS_STRAINER = SoupStrainer('div', class_='result')
+
+# selectolax (Lexbor bindings) is optional and much faster than BeautifulSoup
+# for this fixed page shape; BeautifulSoup is the fallback
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# Shared session: keeps the TCP/TLS connection to DuckDuckGo alive between searches
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+# Set headers once to mimic a browser
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+
+# (connect, read) timeouts so a hung request cannot stall the search forever
+_TIMEOUT = (3, 10)
+
+# httpx is optional; with it several queries are issued concurrently over one
+# client (HTTP/2 multiplexed when h2 is installed)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+H60 = "=" * 60
+D60 = "-" * 60
+
+
+def _parse_results_selectolax(content, max_results):
+    """
+    Extract results from the DuckDuckGo HTML page using selectolax
+    """
+    results = []
+    for div in HTMLParser(content).css('div.result')[:max_results]:
+        result = {}
+        
+        # Extract title and link
+        title_tag = div.css_first('a.result__a')
+        if title_tag:
+            result['title'] = title_tag.text(strip=True)
+            result['url'] = title_tag.attributes.get('href') or ''
+        
+        # Extract snippet/description
+        snippet_tag = div.css_first('a.result__snippet')
+        if snippet_tag:
+            result['snippet'] = snippet_tag.text(strip=True)
+        
+        if result:
+            results.append(result)
+    
+    return results
+
+def _parse_results_bs4(content, max_results):
+    """
+    Extract results from the DuckDuckGo HTML page using BeautifulSoup
+    """
+    soup = BeautifulSoup(content, _PARSER, parse_only=_RESULTS_STRAINER)
+    
+    # Find all search result divs
+    results = []
+    for div in soup.find_all('div', class_='result')[:max_results]:
+        result = {}
+        
+        # Extract title and link
+        title_tag = div.find('a', class_='result__a')
+        if title_tag:
+            result['title'] = title_tag.get_text(strip=True)
+            result['url'] = title_tag.get('href', '')
+        
+        # Extract snippet/description
+        snippet_tag = div.find('a', class_='result__snippet')
+        if snippet_tag:
+            result['snippet'] = snippet_tag.get_text(strip=True)
+        
+        if result:
+            results.append(result)
+    
+    return results
 
 def duckduckgo_html_search(query, max_results=10):
     """
@@ -9,67 +115,90 @@ def duckduckgo_html_search(query, max_results=10):
     # DuckDuckGo HTML search URL
     url = f"https://html.duckduckgo.com/html/?q={quote(query)}"
     
-    # Set headers to mimic a browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
+        response = _SESSION.get(url, timeout=_TIMEOUT)
         response.raise_for_status()
         
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return _build_response(query, response.content, max_results)
         
-        # Find all search result divs
-        results = []
-        result_divs = soup.find_all('div', class_='result')
-        
-        for idx, div in enumerate(result_divs[:max_results]):
-            result = {}
-            
-            # Extract title and link
-            title_tag = div.find('a', class_='result__a')
-            if title_tag:
-                result['title'] = title_tag.get_text(strip=True)
-                result['url'] = title_tag.get('href', '')
-            
-            # Extract snippet/description
-            snippet_tag = div.find('a', class_='result__snippet')
-            if snippet_tag:
-                result['snippet'] = snippet_tag.get_text(strip=True)
-            
-            if result:
-                results.append(result)
+    except Exception as e:
+        return _build_error(query, e)
+
+async def duckduckgo_html_search_async(client, query, max_results=10):
+    """
+    Async variant of duckduckgo_html_search using a shared httpx.AsyncClient
+    """
+    url = f"https://html.duckduckgo.com/html/?q={quote(query)}"
+    
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
         
-        return {
-            'query': query,
-            'num_results': len(results),
-            'results': results
-        }
+        return _build_response(query, response.content, max_results)
         
     except Exception as e:
-        return {
-            'query': query,
-            'error': str(e),
-            'results': []
-        }
-
-# Test the search
-print("Testing DuckDuckGo HTML Search Interface\n")
-print("=" * 60)
-
-results = duckduckgo_html_search("python tutorial", max_results=5)
-
-print(f"\nQuery: {results['query']}")
-print(f"Number of results: {results.get('num_results', 0)}")
-
-if 'error' in results:
-    print(f"\nError: {results['error']}")
-else:
-    print("\nSearch Results:")
-    print("-" * 60)
-    for idx, result in enumerate(results['results'], 1):
-        print(f"\n{idx}. {result.get('title', 'No title')}")
-        print(f"   URL: {result.get('url', 'No URL')}")
-        print(f"   Snippet: {result.get('snippet', 'No snippet')[:150]}...")
+        return _build_error(query, e)
+
+async def duckduckgo_html_search_many(queries, max_results=10):
+    """
+    Run several searches concurrently, returning results in query order
+    """
+    async with httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        headers=dict(_SESSION.headers),
+        timeout=httpx.Timeout(10, connect=3)
+    ) as client:
+        return await asyncio.gather(*[
+            duckduckgo_html_search_async(client, query, max_results) for query in queries
+        ])
+
+def _build_response(query, content, max_results):
+    """
+    Parse the HTML page (bytes: the parser does the decoding itself)
+    """
+    if SELECTOLAX_AVAILABLE:
+        results = _parse_results_selectolax(content, max_results)
+    else:
+        results = _parse_results_bs4(content, max_results)
+    
+    return {
+        'query': query,
+        'num_results': len(results),
+        'results': results
+    }
+
+def _build_error(query, error):
+    return {
+        'query': query,
+        'error': str(error),
+        'results': []
+    }
+
+def print_results(results):
+    print(f"\nQuery: {results['query']}")
+    print(f"Number of results: {results.get('num_results', 0)}")
+    
+    if 'error' in results:
+        print(f"\nError: {results['error']}")
+    else:
+        print("\nSearch Results:")
+        print(D60)
+        for idx, result in enumerate(results['results'], 1):
+            print(f"\n{idx}. {result.get('title', 'No title')}")
+            print(f"   URL: {result.get('url', 'No URL')}")
+            print(f"   Snippet: {result.get('snippet', 'No snippet')[:150]}...")
+
+if __name__ == "__main__":
+    # Test the search (queries can be passed as arguments)
+    queries = sys.argv[1:] or ["python tutorial"]
+    
+    print("Testing DuckDuckGo HTML Search Interface\n")
+    print(H60)
+    
+    if len(queries) > 1 and HTTPX_AVAILABLE:
+        all_results = asyncio.run(duckduckgo_html_search_many(queries, max_results=5))
+    else:
+        all_results = [duckduckgo_html_search(query, max_results=5) for query in queries]
+    
+    for results in all_results:
+        print_results(results)
@@ -15,14 +15,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'agent'))
 from streaming_state_machine import StreamingStateMachine, StreamState
 from streaming_display import StreamingDisplay
 
+H80 = "=" * 80
+D80 = "-" * 80
+
 
 def test_newline_preprocessing():
     """
     Prueba el preprocesamiento de saltos de línea consecutivos
     """
-    print("=" * 80)
+    print(H80)
     print("TEST: Preprocesamiento de saltos de línea consecutivos")
-    print("=" * 80)
+    print(H80)
     
     # Crear display (sin colores para facilitar la verificación)
     display = StreamingDisplay(enable_colors=False)
@@ -32,15 +35,14 @@ def test_newline_preprocessing():
     
     # Caso 1: Texto con múltiples \n\n consecutivos
     print("\n📝 Caso 1: Texto con múltiples \\n\\n")
-    print("-" * 80)
+    print(D80)
     
     test_text_1 = "Línea 1\n\nLínea 2\n\n\nLínea 3\n\n\n\nLínea 4"
     
     print(f"Input: {repr(test_text_1)}")
     
-    # Alimentar tokens
-    for char in test_text_1:
-        machine.feed_token(char)
+    # Alimentar el texto completo en un solo fragmento
+    machine.feed_chunk(test_text_1)
     
     accumulated = machine.get_accumulated_text()
     print(f"Output: {repr(accumulated)}")
@@ -54,7 +56,7 @@ def test_newline_preprocessing():
     
     # Caso 2: Texto dentro de bloques <thinking>
     print("\n📝 Caso 2: Texto con \\n\\n dentro de <thinking>")
-    print("-" * 80)
+    print(D80)
     
     # Reiniciar máquina
     display2 = StreamingDisplay(enable_colors=False)
@@ -64,9 +66,8 @@ def test_newline_preprocessing():
     
     print(f"Input: {repr(test_text_2)}")
     
-    # Alimentar tokens
-    for char in test_text_2:
-        machine2.feed_token(char)
+    # Alimentar el texto completo en un solo fragmento
+    machine2.feed_chunk(test_text_2)
     
     accumulated2 = machine2.get_accumulated_text()
     print(f"Output: {repr(accumulated2)}")
@@ -80,7 +81,7 @@ def test_newline_preprocessing():
     
     # Caso 3: Texto dentro de bloques <present_answer>
     print("\n📝 Caso 3: Texto con \\n\\n dentro de <present_answer>")
-    print("-" * 80)
+    print(D80)
     
     # Reiniciar máquina
     display3 = StreamingDisplay(enable_colors=False)
@@ -90,9 +91,8 @@ def test_newline_preprocessing():
     
     print(f"Input: {repr(test_text_3)}")
     
-    # Alimentar tokens
-    for char in test_text_3:
-        machine3.feed_token(char)
+    # Alimentar el texto completo en un solo fragmento
+    machine3.feed_chunk(test_text_3)
     
     accumulated3 = machine3.get_accumulated_text()
     print(f"Output: {repr(accumulated3)}")
@@ -106,7 +106,7 @@ def test_newline_preprocessing():
     
     # Caso 4: Mantener un solo \n
     print("\n📝 Caso 4: Mantener un solo \\n (no debe eliminarse)")
-    print("-" * 80)
+    print(D80)
     
     # Reiniciar máquina
     display4 = StreamingDisplay(enable_colors=False)
@@ -116,9 +116,8 @@ def test_newline_preprocessing():
     
     print(f"Input: {repr(test_text_4)}")
     
-    # Alimentar tokens
-    for char in test_text_4:
-        machine4.feed_token(char)
+    # Alimentar el texto completo en un solo fragmento
+    machine4.feed_chunk(test_text_4)
     
     accumulated4 = machine4.get_accumulated_text()
     print(f"Output: {repr(accumulated4)}")
@@ -132,7 +131,7 @@ def test_newline_preprocessing():
     
     # Caso 5: Streaming token por token (simulación real)
     print("\n📝 Caso 5: Streaming token por token (simulación real)")
-    print("-" * 80)
+    print(D80)
     
     # Reiniciar máquina
     display5 = StreamingDisplay(enable_colors=False)
@@ -157,9 +156,37 @@ def test_newline_preprocessing():
     else:
         print(f"❌ FAIL: Esperado {repr(expected5)}, obtenido {repr(accumulated5)}")
     
-    print("\n" + "=" * 80)
+    # Caso 6: Varios bloques en un solo fragmento equivalen a token por token
+    print("\n📝 Caso 6: Varios bloques en un solo fragmento")
+    print(D80)
+    
+    test_text_6 = (
+        "Voy a buscar.\n\n<thinking>\nPienso\n\n\nmucho\n</thinking>\n\n"
+        "<tool_semantic_search>\n<query>darwin</query>\n</tool_semantic_search>\n\n"
+        "<present_answer>\nRespuesta\n\nfinal\n</present_answer>\n\n<confidence>high</confidence>"
+    )
+    
+    print(f"Input: {repr(test_text_6)}")
+    
+    machine6_chunk = StreamingStateMachine(StreamingDisplay(enable_colors=False))
+    machine6_chunk.feed_chunk(test_text_6)
+    
+    machine6_chars = StreamingStateMachine(StreamingDisplay(enable_colors=False))
+    for char in test_text_6:
+        machine6_chars.feed_token(char)
+    
+    accumulated6 = machine6_chunk.get_accumulated_text()
+    print(f"\nOutput: {repr(accumulated6)}")
+    
+    if (accumulated6 == machine6_chars.get_accumulated_text()
+            and machine6_chunk.get_current_state() == machine6_chars.get_current_state() == StreamState.NEUTRAL):
+        print("✅ PASS: Un fragmento con varios bloques produce el mismo resultado que token por token")
+    else:
+        print(f"❌ FAIL: Esperado {repr(machine6_chars.get_accumulated_text())}, obtenido {repr(accumulated6)}")
+    
+    print("\n" + H80)
     print("TEST COMPLETADO")
-    print("=" * 80)
+    print(H80)
 
 
 if __name__ == "__main__":
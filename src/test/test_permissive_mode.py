@@ -11,6 +11,11 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from tools.tool_web_crawler import WebCrawlerTool
+from benchmark_utils import measure_repeated, print_timings
+
+H80 = "=" * 80
+D80 = "-" * 80
+
 
 def test_permissive_mode():
     """Prueba el modo permisivo con diferentes queries"""
@@ -21,16 +26,16 @@ def test_permissive_mode():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    print("=" * 80)
+    print(H80)
     print("TEST: Modo Permisivo del Web Crawler")
-    print("=" * 80)
+    print(H80)
     
     # Crear instancia del tool
     tool = WebCrawlerTool(app_name='mulesoft')
     
     # Test 1: Query sobre MuleSoft (debería funcionar con cualquier dominio)
     print("\n📝 Test 1: Búsqueda sobre MuleSoft latest version")
-    print("-" * 80)
+    print(D80)
     
     result = tool.search_and_extract("MuleSoft latest version Mule Runtime current release")
     
@@ -45,7 +50,7 @@ def test_permissive_mode():
     
     # Test 2: Query con dominio que antes estaba bloqueado
     print("\n📝 Test 2: Búsqueda que incluiría dominios no oficiales")
-    print("-" * 80)
+    print(D80)
     
     result2 = tool.search_and_extract("MuleSoft API integration best practices tutorial")
     
@@ -58,9 +63,9 @@ def test_permissive_mode():
     else:
         print(f"❌ Error: {result2.error}")
     
-    print("\n" + "=" * 80)
+    print("\n" + H80)
     print("✅ Tests completados")
-    print("=" * 80)
+    print(H80)
     
     # Verificar configuración
     print("\n📊 Configuración actual:")
@@ -68,5 +73,20 @@ def test_permissive_mode():
     print(f"  - Dominios bloqueados: {len(tool.domain_whitelist.blocked_domains)}")
     print(f"  - Max resultados: {tool.max_results}")
 
+def benchmark_permissive_mode(repeat: int):
+    """Mide el tiempo de search_and_extract repitiéndolo varias veces"""
+    tool = WebCrawlerTool(app_name='mulesoft')
+    query = "MuleSoft latest version Mule Runtime current release"
+    
+    wall_times, cpu_times = measure_repeated(lambda: tool.search_and_extract(query), repeat)
+    
+    print(H80)
+    print(f"BENCHMARK: search_and_extract x{repeat}")
+    print(H80)
+    print_timings(wall_times, cpu_times)
+
 if __name__ == "__main__":
-    test_permissive_mode()
+    if "--repeat" in sys.argv:
+        benchmark_permissive_mode(int(sys.argv[sys.argv.index("--repeat") + 1]))
+    else:
+        test_permissive_mode()
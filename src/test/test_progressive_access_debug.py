@@ -5,6 +5,7 @@ Script de prueba para depurar el acceso progresivo a archivos grandes
 
 import sys
 import os
+from functools import lru_cache
 
 # Agregar el directorio raíz y src al path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
@@ -24,14 +25,32 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+CONFIG_PATH = "config/config_darwin.yaml"
+
+H80 = "=" * 80
+D80 = "-" * 80
+
+
+@lru_cache(maxsize=4)
+def _get_file_tool(config_path: str) -> GetFileContent:
+    """Instancia de GetFileContent reutilizada entre tests"""
+    return GetFileContent(config_path=config_path)
+
+
+@lru_cache(maxsize=4)
+def _request_handler(config_path: str) -> RequestHandler:
+    """Instancia de RequestHandler reutilizada entre tests"""
+    return RequestHandler(config_path=config_path)
+
+
 def test_large_file_formatting():
     """Prueba el formateo de archivos grandes"""
-    print("="*80)
+    print(H80)
     print("TEST: Formateo de archivo grande en modo progresivo")
-    print("="*80)
+    print(H80)
     
     # Crear herramienta
-    tool = GetFileContent(config_path="config/config_darwin.yaml")
+    tool = _get_file_tool(CONFIG_PATH)
     
     # Buscar un archivo grande en el proyecto
     test_file = "src/agent/request_handler.py"  # Este archivo es grande
@@ -55,7 +74,7 @@ def test_large_file_formatting():
             
             # Simular el formateo que hace request_handler
             print(f"\n4. Simulando formateo en _format_file_content:")
-            handler = RequestHandler(config_path="config/config_darwin.yaml")
+            handler = _request_handler(CONFIG_PATH)
             formatted = handler._format_file_content(result)
             
             print(f"\n5. Resultado del formateo:")
@@ -65,9 +84,9 @@ def test_large_file_formatting():
             print(f"   - Contiene 'tool_get_file_section': {'tool_get_file_section' in formatted}")
             
             print(f"\n6. Vista previa del mensaje formateado (primeros 500 caracteres):")
-            print("-"*80)
+            print(D80)
             print(formatted[:500])
-            print("-"*80)
+            print(D80)
             
             print(f"\n✅ TEST COMPLETADO - El formateo parece correcto")
             print(f"   Si el LLM no recibe esto, el problema está en otro lugar del flujo")
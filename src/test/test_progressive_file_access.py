@@ -5,54 +5,44 @@ Prueba DocumentStructureAnalyzer y GetFileSection.
 """
 
 import unittest
+from unittest import mock
 import sys
 import os
 import tempfile
 from pathlib import Path
 
-# Agregar el directorio raíz al path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+# Agregar src al path para importar el paquete tools (con imports perezosos,
+# importar un submódulo no carga el resto de herramientas)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-# Importar directamente los módulos sin pasar por __init__.py
-import importlib.util
-
-# Cargar document_structure_analyzer
-spec1 = importlib.util.spec_from_file_location(
-    "document_structure_analyzer",
-    os.path.join(os.path.dirname(__file__), '..', 'tools', 'document_structure_analyzer.py')
+from tools.document_structure_analyzer import (
+    DocumentStructureAnalyzer, DocumentSection, DocumentStructure, _memory_cache
 )
-doc_analyzer_module = importlib.util.module_from_spec(spec1)
-spec1.loader.exec_module(doc_analyzer_module)
+from tools.tool_get_file_section import GetFileSection
 
-DocumentStructureAnalyzer = doc_analyzer_module.DocumentStructureAnalyzer
-DocumentSection = doc_analyzer_module.DocumentSection
-DocumentStructure = doc_analyzer_module.DocumentStructure
+H80 = "=" * 80
 
-# Cargar tool_get_file_section
-spec2 = importlib.util.spec_from_file_location(
-    "tool_get_file_section",
-    os.path.join(os.path.dirname(__file__), '..', 'tools', 'tool_get_file_section.py')
-)
-file_section_module = importlib.util.module_from_spec(spec2)
-spec2.loader.exec_module(file_section_module)
 
-GetFileSection = file_section_module.GetFileSection
+def _write_file(path: str, content: str):
+    """Escribe un fichero de prueba en UTF-8 con una sola llamada a write(2)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, content.encode('utf-8'))
+    finally:
+        os.close(fd)
 
 
 class TestDocumentStructureAnalyzer(unittest.TestCase):
     """Pruebas para DocumentStructureAnalyzer"""
     
-    def setUp(self):
-        """Configuración antes de cada prueba"""
-        self.analyzer = DocumentStructureAnalyzer()
-        self.test_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        """Limpieza después de cada prueba"""
-        import shutil
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Configuración común a todas las pruebas de la clase"""
+        cls.analyzer = DocumentStructureAnalyzer()
+        # TemporaryDirectory se elimina sola al terminar la clase
+        temp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(temp_dir.cleanup)
+        cls.test_dir = temp_dir.name
     
     def test_analyzer_initialization(self):
         """Prueba que el analizador se inicializa correctamente"""
@@ -68,8 +58,7 @@ class TestDocumentStructureAnalyzer(unittest.TestCase):
         """Prueba que se lanza error con formato no soportado"""
         # Crear archivo temporal con extensión no soportada
         test_file = os.path.join(self.test_dir, "test.xyz")
-        with open(test_file, 'w') as f:
-            f.write("test content")
+        _write_file(test_file, "test content")
         
         with self.assertRaises(ValueError):
             self.analyzer.analyze(test_file)
@@ -87,8 +76,7 @@ Este es el contenido del desarrollo.
 3. Conclusión
 Este es el contenido de la conclusión.
 """
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Analizar
         structure = self.analyzer.analyze(test_file)
@@ -98,8 +86,75 @@ Este es el contenido de la conclusión.
         self.assertEqual(structure.file_type, "txt")
         self.assertEqual(structure.file_name, "test.txt")
         self.assertEqual(structure.total_chars, len(content))
+        self.assertEqual(structure.total_bytes, len(content.encode('utf-8')))
         self.assertGreater(len(structure.sections), 0)
     
+    def test_analyze_text_file_byte_offsets(self):
+        """Prueba que los offsets en bytes delimitan el mismo texto que los de caracteres"""
+        test_file = os.path.join(self.test_dir, "test_bytes.txt")
+        content = """1. Introducción
+Párrafo con acentos: áéíóú ñ.
+
+2. Desarrollo técnico
+Más contenido — con símbolos €.
+"""
+        _write_file(test_file, content)
+        
+        structure = self.analyzer.analyze(test_file)
+        raw = content.encode('utf-8')
+        
+        self.assertEqual(len(structure.sections), 2)
+        for section in structure.sections:
+            self.assertEqual(
+                raw[section.start_byte:section.end_byte].decode('utf-8'),
+                content[section.start_char:section.end_char]
+            )
+    
+    def test_disk_cache_reused_for_copied_file(self):
+        """Prueba que una copia del archivo reutiliza el análisis cacheado en disco"""
+        analyzer = DocumentStructureAnalyzer(cache_dir=Path(self.test_dir) / "cache")
+        original = os.path.join(self.test_dir, "original.txt")
+        copy = os.path.join(self.test_dir, "copia.txt")
+        content = "1. Introducción general\nContenido\n\n2. Desarrollo del tema\nMás contenido\n"
+        _write_file(original, content)
+        _write_file(copy, content)
+        
+        structure = analyzer.analyze(original)
+        
+        with mock.patch.object(analyzer, '_analyze_file', side_effect=AssertionError("sin cache")):
+            cached = analyzer.analyze(copy)
+        
+        self.assertEqual(cached.file_name, "copia.txt")
+        self.assertEqual([s.title for s in cached.sections], [s.title for s in structure.sections])
+    
+    def test_disk_cache_invalidated_by_same_size_edit(self):
+        """Prueba que editar el medio de un archivo grande sin cambiar su tamaño invalida el cache en disco"""
+        analyzer = DocumentStructureAnalyzer(cache_dir=Path(self.test_dir) / "cache")
+        path = os.path.join(self.test_dir, "grande.txt")
+        padding = "contenido de relleno, sin formato.\n" * 5000
+        _write_file(path, padding + "1. Título original\n" + padding)
+        analyzer.analyze(path)
+
+        _write_file(path, padding + "1. Título cambiado\n" + padding)
+        _memory_cache.clear()
+        structure = analyzer.analyze(path)
+
+        self.assertEqual([s.title for s in structure.sections], ["1. Título cambiado"])
+
+    def test_analyze_many_preserves_order(self):
+        """Prueba que analyze_many devuelve una estructura por ruta, en orden"""
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.test_dir, f"lote_{i}.txt")
+            _write_file(path, f"1. Documento {i} del lote\nContenido\n")
+            paths.append(path)
+        paths.append(paths[0])
+        
+        structures = self.analyzer.analyze_many(paths)
+        
+        self.assertEqual([s.file_path for s in structures], paths)
+        self.assertIs(structures[0], structures[-1])
+    
     def test_document_section_dataclass(self):
         """Prueba la clase DocumentSection"""
         section = DocumentSection(
@@ -273,16 +328,13 @@ Este es el contenido de la conclusión.
 class TestGetFileSection(unittest.TestCase):
     """Pruebas para GetFileSection"""
     
-    def setUp(self):
-        """Configuración antes de cada prueba"""
-        self.tool = GetFileSection()
-        self.test_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        """Limpieza después de cada prueba"""
-        import shutil
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Configuración común a todas las pruebas de la clase"""
+        cls.tool = GetFileSection()
+        temp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(temp_dir.cleanup)
+        cls.test_dir = temp_dir.name
     
     def test_tool_initialization(self):
         """Prueba que la herramienta se inicializa correctamente"""
@@ -315,8 +367,7 @@ También tiene varias líneas.
 3. Tercera Sección
 Este es el contenido de la tercera sección.
 """
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Obtener primera sección
         result = self.tool.get_section(
@@ -348,8 +399,7 @@ Contenido de subsección B.
 2. Otra Sección
 Otro contenido.
 """
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Obtener sección con contexto
         result = self.tool.get_section(
@@ -373,8 +423,7 @@ Otro contenido.
         content = """1. Única Sección
 Contenido de la única sección.
 """
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Intentar obtener sección inexistente
         result = self.tool.get_section(
@@ -393,8 +442,7 @@ Contenido de la única sección.
         # Crear archivo
         test_file = os.path.join(self.test_dir, "test_extract.txt")
         content = "A" * 1000 + "B" * 1000 + "C" * 1000
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Crear sección mock
         section = DocumentSection(
@@ -413,21 +461,18 @@ Contenido de la única sección.
         
         # Verificaciones
         self.assertEqual(len(extracted), 1000)
-        self.assertTrue(all(c == 'B' for c in extracted))
+        self.assertEqual(extracted, 'B' * 1000)
 
 
 class TestIntegration(unittest.TestCase):
     """Pruebas de integración entre componentes"""
     
-    def setUp(self):
-        """Configuración antes de cada prueba"""
-        self.test_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        """Limpieza después de cada prueba"""
-        import shutil
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Configuración común a todas las pruebas de la clase"""
+        temp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(temp_dir.cleanup)
+        cls.test_dir = temp_dir.name
     
     def test_full_workflow_text_file(self):
         """Prueba flujo completo: analizar estructura y obtener sección"""
@@ -446,8 +491,7 @@ Incluye varios párrafos de información.
 Esta es la conclusión del documento.
 Resume los puntos principales.
 """
-        with open(test_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _write_file(test_file, content)
         
         # Paso 1: Analizar estructura
         analyzer = DocumentStructureAnalyzer()
@@ -473,7 +517,25 @@ Resume los puntos principales.
 
 
 def run_tests():
-    """Ejecuta todas las pruebas y genera reporte"""
+    """
+    Ejecuta todas las pruebas y devuelve el código de salida
+    
+    Con pytest-xdist instalado, cada clase de prueba se ejecuta en un proceso
+    worker distinto (--dist loadscope mantiene juntas las pruebas de una
+    clase, que comparten su directorio temporal). Sin él, se usa el runner
+    secuencial de unittest.
+    """
+    try:
+        import pytest
+        import xdist  # noqa: F401 (solo se comprueba que esté instalado)
+    except ImportError:
+        return run_tests_serial()
+    
+    return int(pytest.main(['-n', 'auto', '--dist', 'loadscope', __file__]))
+
+
+def run_tests_serial():
+    """Ejecuta todas las pruebas en un solo proceso y genera reporte"""
     # Crear suite de pruebas
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
@@ -488,9 +550,9 @@ def run_tests():
     result = runner.run(suite)
     
     # Generar resumen
-    print("\n" + "=" * 80)
+    print("\n" + H80)
     print("RESUMEN DE PRUEBAS")
-    print("=" * 80)
+    print(H80)
     print(f"Total de pruebas ejecutadas: {result.testsRun}")
     print(f"✅ Exitosas: {result.testsRun - len(result.failures) - len(result.errors)}")
     print(f"❌ Fallidas: {len(result.failures)}")
@@ -3,14 +3,17 @@
 Test del web crawler en modo permisivo para SAP ISU
 """
 
+import io
 import sys
+import time
 import logging
+from contextlib import redirect_stdout
 from pathlib import Path
 
 # Añadir src al path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from tools.tool_web_crawler import execute_web_crawler
+from tools.tool_web_crawler import execute_web_crawler, execute_web_crawler_stream
 
 # Configurar logging
 logging.basicConfig(
@@ -18,11 +21,15 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+H80 = "=" * 80
+D80 = "-" * 80
+
+
 def test_sap_search():
     """Test de búsqueda SAP ISU"""
-    print("\n" + "="*80)
+    print("\n" + H80)
     print("TEST: Web Crawler - SAP ISU en modo permisivo")
-    print("="*80 + "\n")
+    print(H80 + "\n")
     
     # Parámetros de búsqueda
     params = {
@@ -33,38 +40,84 @@ def test_sap_search():
     print(f"📝 Query: {params['query']}")
     print(f"🏢 App: {params['app_name']}")
     print(f"🌐 Sitio esperado: help.sap.com")
-    print("\n" + "-"*80 + "\n")
+    print("\n" + D80 + "\n")
     
     # Ejecutar búsqueda
     result = execute_web_crawler(params)
     
-    # Mostrar resultados
-    if result.success:
-        print(f"✅ ÉXITO - Tiempo: {result.execution_time_ms:.0f}ms\n")
-        
-        data = result.data
-        print(f"📊 Resultados encontrados: {data['results_count']}")
-        print(f"🔍 Query procesada: {data['query']}\n")
+    # Acumular el informe y escribirlo de una sola vez
+    report = io.StringIO()
+    with redirect_stdout(report):
+        # Mostrar resultados
+        if result.success:
+            print(f"✅ ÉXITO - Tiempo: {result.execution_time_ms:.0f}ms\n")
+            
+            data = result.data
+            print(f"📊 Resultados encontrados: {data['results_count']}")
+            print(f"🔍 Query procesada: {data['query']}\n")
+            
+            if 'recommended_urls' in data:
+                print("🔗 URLs recomendadas:")
+                for rec in data['recommended_urls']:
+                    print(f"  {rec['number']}. {rec['url']}")
+                    print(f"     {rec['description']}\n")
+            elif 'sources' in data:
+                print("📄 Fuentes con contenido:")
+                for source in data['sources']:
+                    print(f"  {source['number']}. {source['url']}")
+                    print(f"     Método: {source['extraction_method']}")
+                    print(f"     Contenido: {source['content'][:150]}...\n")
+        else:
+            print(f"❌ ERROR: {result.error}")
+            print(f"⏱️  Tiempo: {result.execution_time_ms:.0f}ms")
         
-        if 'recommended_urls' in data:
-            print("🔗 URLs recomendadas:")
-            for rec in data['recommended_urls']:
-                print(f"  {rec['number']}. {rec['url']}")
-                print(f"     {rec['description']}\n")
-        elif 'sources' in data:
-            print("📄 Fuentes con contenido:")
-            for source in data['sources']:
-                print(f"  {source['number']}. {source['url']}")
-                print(f"     Método: {source['extraction_method']}")
-                print(f"     Contenido: {source['content'][:150]}...\n")
+        print("\n" + H80 + "\n")
+    sys.stdout.write(report.getvalue())
+    
+    return result.success
+
+def test_sap_search_stream():
+    """Test de búsqueda SAP ISU en streaming (execute_web_crawler_stream)"""
+    print("\n" + H80)
+    print("TEST: Web Crawler - SAP ISU en modo permisivo (streaming)")
+    print(H80 + "\n")
+    
+    # Parámetros de búsqueda
+    params = {
+        'query': 'SAP ISU latest version 2024 2025 release notes',
+        'app_name': 'sap'
+    }
+    
+    print(f"📝 Query: {params['query']}")
+    print(f"🏢 App: {params['app_name']}")
+    print(f"🌐 Sitio esperado: help.sap.com")
+    print("\n" + D80 + "\n")
+    
+    # Ejecutar búsqueda en streaming: cada URL se muestra en cuanto llega
+    start_time = time.time()
+    results_count = 0
+    try:
+        for rec in execute_web_crawler_stream(params):
+            if not results_count:
+                print("🔗 URLs recomendadas:")
+            results_count += 1
+            print(f"  {rec['number']}. {rec['url']}")
+            print(f"     {rec['description']}\n")
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+    
+    elapsed_ms = (time.time() - start_time) * 1000
+    if results_count:
+        print(f"✅ ÉXITO - {results_count} resultados en {elapsed_ms:.0f}ms")
     else:
-        print(f"❌ ERROR: {result.error}")
-        print(f"⏱️  Tiempo: {result.execution_time_ms:.0f}ms")
+        print("❌ ERROR: No se encontraron fuentes de información válidas para esta consulta.")
+        print(f"⏱️  Tiempo: {elapsed_ms:.0f}ms")
     
-    print("\n" + "="*80 + "\n")
+    print("\n" + H80 + "\n")
     
-    return result.success
+    return results_count > 0
 
 if __name__ == "__main__":
     success = test_sap_search()
-    sys.exit(0 if success else 1)
+    success_stream = test_sap_search_stream()
+    sys.exit(0 if (success and success_stream) else 1)
@@ -18,11 +18,15 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+H80 = "=" * 80
+D80 = "-" * 80
+
+
 def test_sap_with_site():
     """Test de búsqueda SAP ISU con site:help.sap.com"""
-    print("\n" + "="*80)
+    print("\n" + H80)
     print("TEST: Web Crawler - SAP ISU con site:help.sap.com")
-    print("="*80 + "\n")
+    print(H80 + "\n")
     
     # Parámetros de búsqueda CON site
     params = {
@@ -34,7 +38,7 @@ def test_sap_with_site():
     print(f"📝 Query: {params['query']}")
     print(f"🏢 App: {params['app_name']}")
     print(f"🌐 Sitio forzado: {params['site']}")
-    print("\n" + "-"*80 + "\n")
+    print("\n" + D80 + "\n")
     
     # Ejecutar búsqueda
     result = execute_web_crawler(params)
@@ -69,7 +73,7 @@ def test_sap_with_site():
         print(f"❌ ERROR: {result.error}")
         print(f"⏱️  Tiempo: {result.execution_time_ms:.0f}ms")
     
-    print("\n" + "="*80 + "\n")
+    print("\n" + H80 + "\n")
     
     return result.success
 
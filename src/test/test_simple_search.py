@@ -3,14 +3,18 @@
 Test simple del web crawler con búsqueda que seguro devuelve resultados
 """
 
+import io
 import sys
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Añadir src al path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from tools.tool_web_crawler import execute_web_crawler
+from tools.tool_web_crawler import execute_web_crawler, execute_web_crawler_stream, extract_domain
 
 # Configurar logging
 logging.basicConfig(
@@ -18,11 +22,37 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+H80 = "=" * 80
+D80 = "-" * 80
+
+
+class _PerThreadStdout:
+    """Proxy de stdout que envía la salida de cada hilo a su propio buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        getattr(self._local, 'buffer', self.stream).flush()
+    
+    def capture(self, test_func):
+        """Ejecuta test_func acumulando su salida; devuelve (resultado, salida)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return test_func(), self._local.buffer.getvalue()
+        finally:
+            del self._local.buffer
+
+
 def test_simple_search():
     """Test con búsqueda simple que debería devolver resultados"""
-    print("\n" + "="*80)
+    print("\n" + H80)
     print("TEST: Web Crawler - Búsqueda simple de MuleSoft")
-    print("="*80 + "\n")
+    print(H80 + "\n")
     
     # Búsqueda simple de MuleSoft que debería funcionar
     params = {
@@ -32,7 +62,7 @@ def test_simple_search():
     
     print(f"📝 Query: {params['query']}")
     print(f"🏢 App: {params['app_name']}")
-    print("\n" + "-"*80 + "\n")
+    print("\n" + D80 + "\n")
     
     # Ejecutar búsqueda
     result = execute_web_crawler(params)
@@ -60,15 +90,15 @@ def test_simple_search():
         print(f"❌ ERROR: {result.error}")
         print(f"⏱️  Tiempo: {result.execution_time_ms:.0f}ms")
     
-    print("\n" + "="*80 + "\n")
+    print("\n" + H80 + "\n")
     
     return result.success
 
 def test_sap_simple():
     """Test con búsqueda simple de SAP"""
-    print("\n" + "="*80)
+    print("\n" + H80)
     print("TEST: Web Crawler - Búsqueda simple de SAP")
-    print("="*80 + "\n")
+    print(H80 + "\n")
     
     # Búsqueda simple de SAP
     params = {
@@ -78,7 +108,7 @@ def test_sap_simple():
     
     print(f"📝 Query: {params['query']}")
     print(f"🏢 App: {params['app_name']}")
-    print("\n" + "-"*80 + "\n")
+    print("\n" + D80 + "\n")
     
     # Ejecutar búsqueda
     result = execute_web_crawler(params)
@@ -96,7 +126,7 @@ def test_sap_simple():
             for rec in data['recommended_urls']:
                 url = rec['url']
                 # Verificar dominio
-                domain = url.split('/')[2] if len(url.split('/')) > 2 else 'unknown'
+                domain = extract_domain(url) or 'unknown'
                 print(f"  {rec['number']}. {url}")
                 print(f"     Dominio: {domain}")
                 print(f"     {rec['description']}\n")
@@ -104,7 +134,7 @@ def test_sap_simple():
             print("📄 Fuentes con contenido:")
             for source in data['sources']:
                 url = source['url']
-                domain = url.split('/')[2] if len(url.split('/')) > 2 else 'unknown'
+                domain = extract_domain(url) or 'unknown'
                 print(f"  {source['number']}. {url}")
                 print(f"     Dominio: {domain}")
                 print(f"     Método: {source['extraction_method']}")
@@ -113,25 +143,77 @@ def test_sap_simple():
         print(f"❌ ERROR: {result.error}")
         print(f"⏱️  Tiempo: {result.execution_time_ms:.0f}ms")
     
-    print("\n" + "="*80 + "\n")
+    print("\n" + H80 + "\n")
     
     return result.success
 
+def test_simple_search_stream():
+    """Test de la búsqueda simple de MuleSoft en streaming (execute_web_crawler_stream)"""
+    print("\n" + H80)
+    print("TEST: Web Crawler - Búsqueda simple de MuleSoft (streaming)")
+    print(H80 + "\n")
+    
+    # Búsqueda simple de MuleSoft que debería funcionar
+    params = {
+        'query': 'MuleSoft runtime latest version',
+        'app_name': 'mulesoft'
+    }
+    
+    print(f"📝 Query: {params['query']}")
+    print(f"🏢 App: {params['app_name']}")
+    print("\n" + D80 + "\n")
+    
+    # Ejecutar búsqueda en streaming: cada URL se muestra en cuanto llega
+    start_time = time.time()
+    results_count = 0
+    try:
+        for rec in execute_web_crawler_stream(params):
+            if not results_count:
+                print("🔗 URLs recomendadas:")
+            results_count += 1
+            print(f"  {rec['number']}. {rec['url']}")
+            print(f"     {rec['description']}\n")
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+    
+    elapsed_ms = (time.time() - start_time) * 1000
+    if results_count:
+        print(f"✅ ÉXITO - {results_count} resultados en {elapsed_ms:.0f}ms")
+    else:
+        print("❌ ERROR: No se encontraron fuentes de información válidas para esta consulta.")
+        print(f"⏱️  Tiempo: {elapsed_ms:.0f}ms")
+    
+    print("\n" + H80 + "\n")
+    
+    return results_count > 0
+
 if __name__ == "__main__":
     print("\n🔍 EJECUTANDO TESTS DE WEB CRAWLER\n")
     
-    # Test 1: MuleSoft
-    success1 = test_simple_search()
-    
-    # Test 2: SAP
-    success2 = test_sap_simple()
+    # Tests en paralelo: todos esperan sobre todo a la red. Cada hilo
+    # acumula su informe en su propio buffer y se escriben en orden al final
+    stdout = _PerThreadStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            future1 = executor.submit(stdout.capture, test_simple_search)
+            future2 = executor.submit(stdout.capture, test_sap_simple)
+            future3 = executor.submit(stdout.capture, test_simple_search_stream)
+            (success1, report1), (success2, report2), (success3, report3) = (
+                future1.result(), future2.result(), future3.result()
+            )
+    finally:
+        sys.stdout = stdout.stream
+    
+    sys.stdout.write(report1 + report2 + report3)
     
     # Resumen
-    print("\n" + "="*80)
+    print("\n" + H80)
     print("RESUMEN DE TESTS")
-    print("="*80)
+    print(H80)
     print(f"Test MuleSoft: {'✅ ÉXITO' if success1 else '❌ FALLO'}")
     print(f"Test SAP: {'✅ ÉXITO' if success2 else '❌ FALLO'}")
-    print("="*80 + "\n")
+    print(f"Test MuleSoft (streaming): {'✅ ÉXITO' if success3 else '❌ FALLO'}")
+    print(H80 + "\n")
     
-    sys.exit(0 if (success1 and success2) else 1)
+    sys.exit(0 if (success1 and success2 and success3) else 1)
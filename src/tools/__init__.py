@@ -6,16 +6,31 @@ Este módulo contiene las herramientas disponibles para el agente:
 - tool_semantic_search: Búsqueda semántica usando embeddings
 - tool_regex_search: Búsqueda por expresiones regulares
 - tool_get_file_content: Obtención de contenido de archivos
+
+Las clases se importan de forma perezosa (PEP 562): importar el paquete o
+uno de sus submódulos no carga el resto de herramientas ni sus clientes.
 """
 
-from .tool_lexical_search import LexicalSearch
-from .tool_semantic_search import SemanticSearch
-from .tool_regex_search import RegexSearch
-from .tool_get_file_content import GetFileContent
-
-__all__ = [
-    'LexicalSearch',
-    'SemanticSearch',
-    'RegexSearch',
-    'GetFileContent'
-]
+import importlib
+
+_LAZY_IMPORTS = {
+    'LexicalSearch': '.tool_lexical_search',
+    'SemanticSearch': '.tool_semantic_search',
+    'RegexSearch': '.tool_regex_search',
+    'GetFileContent': '.tool_get_file_content'
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
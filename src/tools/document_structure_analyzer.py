@@ -5,27 +5,54 @@ Extrae la jerarquía de secciones de PDFs y DOCX para navegación progresiva.
 """
 
 import re
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Tuple, Dict, Any
+import os
+import bisect
+import mmap
+import multiprocessing
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice, repeat
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Dict, Any, Iterable, TextIO
 from pathlib import Path
 import logging
 
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
 try:
     import PyPDF2
     PDF_AVAILABLE = True
 except ImportError:
     PDF_AVAILABLE = False
-    logging.warning("PyPDF2 no disponible. Instalar con: pip3 install PyPDF2")
+    if not FITZ_AVAILABLE:
+        logging.warning("PyMuPDF/PyPDF2 no disponibles. Instalar con: pip3 install PyMuPDF")
 
 try:
-    from docx import Document as DocxDocument
+    # lxml llega como dependencia de python-docx; los DOCX se leen con él directamente
+    from lxml import etree
     DOCX_AVAILABLE = True
 except ImportError:
     DOCX_AVAILABLE = False
-    logging.warning("python-docx no disponible. Instalar con: pip3 install python-docx")
+    logging.warning("lxml no disponible (lectura de DOCX). Instalar con: pip3 install python-docx")
+
 
+# __slots__ en las dataclasses (Python 3.10+): sin __dict__ por instancia,
+# lo que reduce memoria en documentos con miles de secciones
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class DocumentSection:
     """Representa una sección del documento"""
     id: str                          # "section_1", "section_1.1", etc.
@@ -38,17 +65,42 @@ class DocumentSection:
     char_count: Optional[int] = None # Número de caracteres
     parent_id: Optional[str] = None  # ID de la sección padre
     children_ids: List[str] = None   # IDs de subsecciones
+    start_byte: Optional[int] = None # Offset en bytes (UTF-8) del inicio en el archivo (solo texto)
+    end_byte: Optional[int] = None   # Offset en bytes (UTF-8) del fin en el archivo (solo texto)
     
     def __post_init__(self):
         if self.children_ids is None:
             self.children_ids = []
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convierte a diccionario"""
-        return asdict(self)
+        """Convierte a diccionario (copia superficial, sin el recorrido recursivo de asdict)"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "level": self.level,
+            "start_page": self.start_page,
+            "end_page": self.end_page,
+            "start_char": self.start_char,
+            "end_char": self.end_char,
+            "char_count": self.char_count,
+            "parent_id": self.parent_id,
+            "children_ids": list(self.children_ids),
+            "start_byte": self.start_byte,
+            "end_byte": self.end_byte
+        }
+    
+    def toc_entry(self) -> Dict[str, Any]:
+        """Entrada de la tabla de contenidos para esta sección"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "level": self.level,
+            "pages": f"{self.start_page}-{self.end_page}",
+            "chars": self.char_count or 0
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class DocumentStructure:
     """Estructura completa del documento"""
     file_path: str
@@ -58,53 +110,280 @@ class DocumentStructure:
     total_chars: int
     sections: List[DocumentSection]
     extraction_method: str           # "bookmarks", "text_analysis", "headings"
+    total_bytes: Optional[int] = None # Tamaño del archivo en bytes
+    _id_index: Optional[Tuple[int, Dict[str, int]]] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte a diccionario"""
+        # Secciones y tabla de contenidos en una sola pasada
+        sections = []
+        toc = []
+        for section in self.sections:
+            sections.append(section.to_dict())
+            toc.append(section.toc_entry())
+        
         return {
             "file_path": self.file_path,
             "file_name": self.file_name,
             "file_type": self.file_type,
             "total_pages": self.total_pages,
             "total_chars": self.total_chars,
-            "sections": [s.to_dict() for s in self.sections],
+            "sections": sections,
             "extraction_method": self.extraction_method,
-            "table_of_contents": self.generate_toc()
+            "total_bytes": self.total_bytes,
+            "table_of_contents": toc
         }
     
+    def write_json(self, fp: TextIO, extra: Optional[Dict[str, Any]] = None):
+        """
+        Escribe el mismo JSON que to_dict() directamente en fp, sección a sección.
+        
+        Evita materializar el diccionario completo (secciones y TOC) antes de
+        serializar, lo que en documentos con miles de secciones duplica el pico
+        de memoria.
+        
+        Args:
+            fp: Archivo de texto abierto para escritura
+            extra: Claves adicionales a incluir al principio del objeto
+        """
+        header = dict(extra or {})
+        header.update({
+            "file_path": self.file_path,
+            "file_name": self.file_name,
+            "file_type": self.file_type,
+            "total_pages": self.total_pages,
+            "total_chars": self.total_chars,
+            "extraction_method": self.extraction_method,
+            "total_bytes": self.total_bytes
+        })
+        
+        fp.write("{\n")
+        for key, value in header.items():
+            fp.write(f"  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n")
+        
+        fp.write('  "sections": [')
+        for i, section in enumerate(self.sections):
+            fp.write(",\n    " if i else "\n    ")
+            fp.write(json.dumps(section.to_dict(), ensure_ascii=False))
+        fp.write("\n  ],\n")
+        
+        fp.write('  "table_of_contents": [')
+        for i, section in enumerate(self.sections):
+            fp.write(",\n    " if i else "\n    ")
+            fp.write(json.dumps(section.toc_entry(), ensure_ascii=False))
+        fp.write("\n  ]\n}\n")
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DocumentStructure':
+        """Reconstruye la estructura desde el diccionario generado por to_dict"""
+        return cls(
+            file_path=data["file_path"],
+            file_name=data["file_name"],
+            file_type=data["file_type"],
+            total_pages=data["total_pages"],
+            total_chars=data["total_chars"],
+            sections=[DocumentSection(**s) for s in data["sections"]],
+            extraction_method=data["extraction_method"],
+            total_bytes=data.get("total_bytes")
+        )
+    
     def generate_toc(self) -> List[Dict[str, Any]]:
         """Genera tabla de contenidos formateada"""
-        toc = []
-        for section in self.sections:
-            toc.append({
-                "id": section.id,
-                "title": section.title,
-                "level": section.level,
-                "pages": f"{section.start_page}-{section.end_page}",
-                "chars": section.char_count or 0
-            })
-        return toc
+        return [section.toc_entry() for section in self.sections]
     
     def get_section_by_id(self, section_id: str) -> Optional[DocumentSection]:
         """Obtiene una sección por su ID"""
-        for section in self.sections:
-            if section.id == section_id:
-                return section
-        return None
+        # Índice id -> posición, construido en la primera consulta y
+        # reconstruido si la lista de secciones ha cambiado desde entonces
+        if self._id_index is None or self._id_index[0] != len(self.sections):
+            self._build_id_index()
+        
+        i = self._id_index[1].get(section_id)
+        if i is not None and self.sections[i].id != section_id:
+            # Secciones reordenadas o sustituidas: reconstruir el índice
+            self._build_id_index()
+            i = self._id_index[1].get(section_id)
+        
+        return self.sections[i] if i is not None else None
+    
+    def _build_id_index(self):
+        """Construye el índice id -> posición (gana la primera sección con cada id)"""
+        index = {}
+        for i, section in enumerate(self.sections):
+            index.setdefault(section.id, i)
+        self._id_index = (len(self.sections), index)
+
+
+# Detector de títulos para texto plano. Equivale a aplicar línea a línea
+# (sobre la línea sin espacios alrededor) los patrones:
+#   - Números con punto: "1. Título", "1.1 Título"
+#   - Capítulos: "CAPÍTULO 1", "CHAPTER 1"
+#   - Secciones: "SECCIÓN 1", "SECTION 1"
+#   - Anexos: "ANEXO A", "APPENDIX A"
+#   - Títulos en mayúsculas
+# pero compilado una sola vez y recorriendo todo el texto con finditer.
+# [^\S\n] es espacio en blanco sin salto de línea, para que ningún título
+# pueda abarcar varias líneas.
+_TEXT_HEADER_RE = re.compile(
+    r'^[^\S\n]*(?P<title>'
+    r'\d+(?:\.\d+)*[^\S\n]*[.\-:)]?[^\S\n]+[A-ZÁÉÍÓÚÑ][^\n]{3,100}?'
+    r'|(?:CAP[ÍI]TULO|CHAPTER)[^\S\n]+\d+(?::|[^\S\n])+[^\n]{3,100}?'
+    r'|(?:SECCI[ÓO]N|SECTION)[^\S\n]+\d+(?::|[^\S\n])+[^\n]{3,100}?'
+    r'|(?:ANEXO|AP[ÉE]NDICE|APPENDIX)[^\S\n]+[A-Z\d]+(?::|[^\S\n])+[^\n]{3,100}?'
+    r'|[A-ZÁÉÍÓÚÑ](?:[A-ZÁÉÍÓÚÑ]|[^\S\n]){3,48}[A-ZÁÉÍÓÚÑ]'
+    r')[^\S\n]*$',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# Patrones de títulos de sección en el texto de un PDF, fusionados en una sola
+# alternancia (se prueban en orden, como antes uno a uno):
+# - Números con punto: "1. Título", "1.1 Título"
+# - Capítulos: "CAPÍTULO 1", "CHAPTER 1"
+# - Secciones: "SECCIÓN 1", "SECTION 1"
+# - Anexos: "ANEXO A", "APPENDIX A"
+# Se aplica con finditer sobre el texto completo: cada título ocupa una línea
+# entera (salvo espacios en los extremos, que el título nunca incluye al final)
+# y ningún patrón cruza un salto de línea.
+_PDF_SECTION_RE = re.compile(
+    r'^[^\S\n]*(?P<heading>'
+    r'(?P<number>\d+(?:\.\d+)*)[^\S\n]*[.\-:)]?[^\S\n]+(?P<number_title>[A-ZÁÉÍÓÚÑ][^\n]{2,99}?\S)'
+    r'|(?:CAP[ÍI]TULO|CHAPTER)[^\S\n]+\d+(?::|[^\S\n])+(?P<chapter_title>[^\n]{2,99}?\S)'
+    r'|(?:SECCI[ÓO]N|SECTION)[^\S\n]+\d+(?::|[^\S\n])+(?P<section_title>[^\n]{2,99}?\S)'
+    r'|(?:ANEXO|AP[ÉE]NDICE|APPENDIX)[^\S\n]+[A-Z\d]+(?::|[^\S\n])+(?P<annex_title>[^\n]{2,99}?\S)'
+    r')[^\S\n]*$',
+    re.MULTILINE | re.IGNORECASE
+)
+_PDF_TITLE_GROUPS = ('number_title', 'chapter_title', 'section_title', 'annex_title')
+
+# Páginas mínimas por proceso al extraer el texto de un PDF en paralelo
+_PDF_PAGES_PER_WORKER = 20
+
+# Lectura de DOCX: XPaths precompiladas sobre word/document.xml y word/styles.xml
+_W_NAMESPACES = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+_W = '{%s}' % _W_NAMESPACES['w']
+_W_TYPE = _W + 'type'
+_W_T = _W + 't'
+_W_BR = _W + 'br'
+_DOCX_RUN_TEXT = {_W + 'tab': '\t', _W + 'ptab': '\t', _W + 'cr': '\n', _W + 'noBreakHyphen': '-'}
+
+if DOCX_AVAILABLE:
+    _DOCX_PARSER = etree.XMLParser(resolve_entities=False)
+    _DOCX_BODY_PARAGRAPHS = etree.XPath('/w:document/w:body/w:p', namespaces=_W_NAMESPACES)
+    _DOCX_RUN_CONTENT = etree.XPath('(w:r | w:hyperlink/w:r)/*', namespaces=_W_NAMESPACES)
+    _DOCX_STYLE_ID = etree.XPath('string(w:pPr/w:pStyle/@w:val)', namespaces=_W_NAMESPACES)
+    _DOCX_PARAGRAPH_STYLES = etree.XPath(
+        "/w:styles/w:style[not(@w:type) or @w:type='paragraph']", namespaces=_W_NAMESPACES
+    )
+    _DOCX_STYLE_NAME = etree.XPath('string(w:name/@w:val)', namespaces=_W_NAMESPACES)
+
+# Tamaño de bloque al calcular el hash del contenido para el cache en disco
+_FINGERPRINT_BLOCK = 1024 * 1024
+
+# Cache en memoria compartido por todos los analizadores del proceso
+_MEMORY_CACHE_SIZE = 256
+_memory_cache: "OrderedDict[Tuple[str, int, int], DocumentStructure]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+# Hilos por defecto de analyze_many (la espera es sobre todo de E/S)
+_ANALYZE_MANY_WORKERS = 8
+
+
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[Optional[str]]:
+    """Texto de las páginas [start, end) de un PDF (función de los procesos worker)"""
+    if FITZ_AVAILABLE:
+        with fitz.open(file_path) as doc:
+            return [doc[page_num].get_text("text") for page_num in range(start, end)]
+    
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[page_num].extract_text() for page_num in range(start, end)]
+
+
+def read_docx_paragraphs(file_path: str) -> List[Tuple[str, str]]:
+    """
+    Lee los párrafos del cuerpo de un DOCX como (texto, nombre de estilo).
+    
+    Devuelve lo mismo que recorrer Document(file_path).paragraphs de
+    python-docx (texto de runs e hipervínculos, tabulaciones y saltos de
+    línea incluidos), pero parseando el XML una sola vez con lxml: sin
+    objetos proxy por párrafo y resolviendo cada estilo una única vez.
+    
+    Args:
+        file_path: Ruta al archivo DOCX
+        
+    Returns:
+        Lista de tuplas (texto, nombre de estilo) en orden del documento
+    """
+    with zipfile.ZipFile(file_path) as docx:
+        document = etree.fromstring(docx.read('word/document.xml'), _DOCX_PARSER)
+        try:
+            styles = etree.fromstring(docx.read('word/styles.xml'), _DOCX_PARSER)
+        except KeyError:
+            styles = None
+    
+    # styleId -> nombre visible, como lo resuelve python-docx
+    style_names = {}
+    default_style = ''
+    if styles is not None:
+        for style in _DOCX_PARAGRAPH_STYLES(styles):
+            name = _DOCX_STYLE_NAME(style)
+            # Los estilos integrados se guardan en minúsculas ("heading 1")
+            if name.startswith('heading '):
+                name = 'H' + name[1:]
+            style_names[style.get(_W + 'styleId')] = name
+            if style.get(_W + 'default') in ('1', 'true', 'on'):
+                default_style = name
+    
+    paragraphs = []
+    for paragraph in _DOCX_BODY_PARAGRAPHS(document):
+        parts = []
+        for element in _DOCX_RUN_CONTENT(paragraph):
+            tag = element.tag
+            if tag == _W_T:
+                parts.append(element.text or '')
+            elif tag == _W_BR:
+                # Solo los saltos de línea cuentan; los de página o columna no
+                if element.get(_W_TYPE, 'textWrapping') == 'textWrapping':
+                    parts.append('\n')
+            else:
+                parts.append(_DOCX_RUN_TEXT.get(tag, ''))
+        
+        style_name = style_names.get(_DOCX_STYLE_ID(paragraph), default_style)
+        paragraphs.append((''.join(parts), style_name))
+    
+    return paragraphs
 
 
 class DocumentStructureAnalyzer:
     """Analizador principal de estructura de documentos"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 pdf_workers: int = 1):
+        """
+        Args:
+            cache_dir: Directorio del cache en disco (por defecto None: solo
+                cache en memoria)
+            pdf_workers: Procesos para extraer el texto de PDFs largos
+                (por defecto 1: sin pool de procesos)
+        """
         self.logger = logging.getLogger(__name__)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.pdf_workers = max(1, pdf_workers or 1)
     
-    def analyze(self, file_path: str) -> DocumentStructure:
+    def analyze(self, file_path: str, use_cache: bool = True) -> DocumentStructure:
         """
         Analiza un documento y extrae su estructura.
         
+        Las estructuras se cachean en memoria (LRU), indexadas por (ruta
+        absoluta, mtime, tamaño), y, si se configuró cache_dir, en disco,
+        indexadas por el contenido (SHA-1 del archivo completo): mientras el
+        archivo no cambie, las llamadas repetidas no vuelven a analizarlo, y
+        una copia o un archivo movido o tocado reutiliza el análisis en disco.
+        La estructura devuelta desde el cache es compartida y no debe modificarse.
+        
         Args:
             file_path: Ruta al archivo a analizar
+            use_cache: Si False, analiza siempre el archivo (y refresca el cache)
             
         Returns:
             DocumentStructure con la jerarquía del documento
@@ -118,7 +397,57 @@ class DocumentStructureAnalyzer:
         if not path.exists():
             raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
         
-        file_type = path.suffix.lower()
+        stat = path.stat()
+        cache_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        
+        if use_cache:
+            structure = self._get_cached(cache_key, file_path)
+            if structure is not None:
+                return structure
+        
+        structure = self._analyze_file(file_path)
+        structure.total_bytes = stat.st_size
+        self._set_cached(cache_key, structure)
+        return structure
+    
+    def analyze_many(self, file_paths: List[str], use_cache: bool = True,
+                     max_workers: Optional[int] = None) -> List[DocumentStructure]:
+        """
+        Analiza varios documentos en paralelo.
+        
+        Las rutas duplicadas se analizan una sola vez y las lecturas de
+        archivos distintos se solapan en un pool de hilos, de modo que la
+        espera de E/S de un archivo no bloquea al resto.
+        
+        Args:
+            file_paths: Rutas de los archivos a analizar
+            use_cache: Si False, analiza siempre cada archivo (y refresca el cache)
+            max_workers: Hilos a usar (por defecto hasta _ANALYZE_MANY_WORKERS)
+            
+        Returns:
+            Lista de DocumentStructure, en el mismo orden de entrada
+            
+        Raises:
+            ValueError: Si algún formato no es soportado
+            FileNotFoundError: Si algún archivo no existe
+        """
+        unique_paths = list(dict.fromkeys(file_paths))
+        if not unique_paths:
+            return []
+        
+        workers = min(max_workers or _ANALYZE_MANY_WORKERS, len(unique_paths))
+        if workers <= 1:
+            structures = [self.analyze(path, use_cache) for path in unique_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                structures = list(executor.map(self.analyze, unique_paths, repeat(use_cache)))
+        
+        by_path = dict(zip(unique_paths, structures))
+        return [by_path[path] for path in file_paths]
+    
+    def _analyze_file(self, file_path: str) -> DocumentStructure:
+        """Analiza el documento según su tipo, sin pasar por el cache"""
+        file_type = Path(file_path).suffix.lower()
         
         if file_type == '.pdf':
             return self._analyze_pdf(file_path)
@@ -129,216 +458,400 @@ class DocumentStructureAnalyzer:
         else:
             raise ValueError(f"Formato no soportado: {file_type}")
     
+    def _cache_file(self, cache_key: Tuple[str, int, int]) -> Optional[Path]:
+        """Ruta del JSON en disco para una clave de cache (según el contenido)"""
+        if self.cache_dir is None:
+            return None
+        
+        resolved_path, _, size = cache_key
+        try:
+            digest = self._file_fingerprint(resolved_path, size)
+        except OSError:
+            return None
+        return self.cache_dir / f"{digest}.json"
+    
+    @staticmethod
+    def _file_fingerprint(file_path: str, size: int) -> str:
+        """
+        Huella del contenido: SHA-1 del tamaño y del archivo completo, leído
+        en bloques de _FINGERPRINT_BLOCK bytes. Cualquier cambio, aunque no
+        altere el tamaño ni los extremos del archivo, cambia la huella
+        """
+        digest = hashlib.sha1(str(size).encode('ascii'))
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(_FINGERPRINT_BLOCK), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _get_cached(self, cache_key: Tuple[str, int, int],
+                    file_path: str) -> Optional[DocumentStructure]:
+        """Busca la estructura en el cache en memoria y, si no está, en disco"""
+        with _memory_cache_lock:
+            structure = _memory_cache.get(cache_key)
+            if structure is not None:
+                _memory_cache.move_to_end(cache_key)
+                return structure
+        
+        cache_file = self._cache_file(cache_key)
+        if cache_file is None or not cache_file.exists():
+            return None
+        
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                structure = DocumentStructure.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.debug(f"Cache de estructura inválido en {cache_file}: {e}")
+            return None
+        
+        # El JSON pudo generarse desde otra ruta con el mismo contenido
+        structure.file_path = file_path
+        structure.file_name = Path(file_path).name
+        
+        self._remember(cache_key, structure)
+        return structure
+    
+    def _set_cached(self, cache_key: Tuple[str, int, int], structure: DocumentStructure):
+        """Guarda la estructura en memoria y en disco (escritura atómica)"""
+        self._remember(cache_key, structure)
+        
+        cache_file = self._cache_file(cache_key)
+        if cache_file is None:
+            return
+        
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    structure.write_json(f)
+                os.replace(tmp_path, cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            self.logger.debug(f"No se pudo guardar el cache de estructura en {cache_file}: {e}")
+    
+    @staticmethod
+    def _remember(cache_key: Tuple[str, int, int], structure: DocumentStructure):
+        """Inserta en el LRU en memoria, descartando la entrada más antigua"""
+        with _memory_cache_lock:
+            _memory_cache[cache_key] = structure
+            _memory_cache.move_to_end(cache_key)
+            if len(_memory_cache) > _MEMORY_CACHE_SIZE:
+                _memory_cache.popitem(last=False)
+    
     def _analyze_pdf(self, file_path: str) -> DocumentStructure:
-        """Analiza estructura de un PDF"""
-        if not PDF_AVAILABLE:
-            raise ImportError("PyPDF2 no está instalado. Ejecutar: pip3 install PyPDF2")
+        """
+        Analiza estructura de un PDF
+        
+        Usa PyMuPDF (fitz) si está instalado, mucho más rápido extrayendo
+        texto; si no, recurre a PyPDF2.
+        """
+        if not FITZ_AVAILABLE and not PDF_AVAILABLE:
+            raise ImportError("PyMuPDF no está instalado. Ejecutar: pip3 install PyMuPDF")
         
         path = Path(file_path)
+        sections = []
+        extraction_method = "none"
         
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            total_pages = len(reader.pages)
-            
-            # Extraer texto completo para contar caracteres
-            full_text = ""
-            for page in reader.pages:
-                full_text += page.extract_text() + "\n"
-            
-            total_chars = len(full_text)
-            
-            # Intentar extraer estructura desde bookmarks
-            sections = []
-            extraction_method = "none"
+        if FITZ_AVAILABLE:
+            with fitz.open(file_path) as doc:
+                total_pages = doc.page_count
+                
+                # Extraer texto completo para contar caracteres
+                page_texts = self._pdf_page_texts(
+                    file_path, total_pages, (page.get_text("text") for page in doc)
+                )
+                full_text, page_offsets = self._join_pdf_pages(page_texts)
+                toc = doc.get_toc(simple=True)
             
             # Método 1: Usar bookmarks/outlines del PDF
-            if reader.outline:
+            if toc:
                 self.logger.info("Extrayendo estructura desde bookmarks del PDF")
-                sections = self._extract_from_pdf_bookmarks(reader, full_text)
-                extraction_method = "bookmarks"
-            
-            # Método 2: Análisis de texto si no hay bookmarks
-            if not sections:
-                self.logger.info("No hay bookmarks. Analizando texto para detectar secciones")
-                sections = self._extract_from_pdf_text(reader, full_text)
-                extraction_method = "text_analysis"
-            
-            # Si no se encontraron secciones, crear una sección por defecto
-            if not sections:
-                self.logger.warning("No se detectaron secciones. Creando sección única")
-                sections = [DocumentSection(
-                    id="section_1",
-                    title="Documento Completo",
-                    level=1,
-                    start_page=1,
-                    end_page=total_pages,
-                    start_char=0,
-                    end_char=total_chars,
-                    char_count=total_chars
-                )]
-                extraction_method = "default"
+                sections = self._extract_from_pdf_bookmarks_fitz(toc, total_pages)
+        else:
+            with open(file_path, 'rb') as file:
+                reader = PyPDF2.PdfReader(file)
+                total_pages = len(reader.pages)
+                
+                # Extraer texto completo para contar caracteres
+                page_texts = self._pdf_page_texts(
+                    file_path, total_pages, (page.extract_text() for page in reader.pages)
+                )
+                full_text, page_offsets = self._join_pdf_pages(page_texts)
+                
+                # Método 1: Usar bookmarks/outlines del PDF
+                if reader.outline:
+                    self.logger.info("Extrayendo estructura desde bookmarks del PDF")
+                    sections = self._extract_from_pdf_bookmarks(reader, full_text)
+        
+        total_chars = len(full_text)
+        if sections:
+            extraction_method = "bookmarks"
+        
+        # Método 2: Análisis de texto si no hay bookmarks
+        if not sections:
+            self.logger.info("No hay bookmarks. Analizando texto para detectar secciones")
+            sections = self._extract_from_pdf_text(full_text, page_offsets)
+            extraction_method = "text_analysis"
+        
+        # Si no se encontraron secciones, crear una sección por defecto
+        if not sections:
+            self.logger.warning("No se detectaron secciones. Creando sección única")
+            sections = [DocumentSection(
+                id="section_1",
+                title="Documento Completo",
+                level=1,
+                start_page=1,
+                end_page=total_pages,
+                start_char=0,
+                end_char=total_chars,
+                char_count=total_chars
+            )]
+            extraction_method = "default"
+        
+        return DocumentStructure(
+            file_path=file_path,
+            file_name=path.name,
+            file_type="pdf",
+            total_pages=total_pages,
+            total_chars=total_chars,
+            sections=sections,
+            extraction_method=extraction_method
+        )
+    
+    @staticmethod
+    def _close_char_ranges(sections: List[DocumentSection], total_chars: int):
+        """
+        Fija end_char y char_count: cada sección termina justo antes de que
+        empiece la siguiente y la última al final del texto
+        """
+        for section, next_section in zip(sections, islice(sections, 1, None)):
+            section.end_char = next_section.start_char - 1
+            section.char_count = section.end_char - section.start_char
+        
+        if sections:
+            last = sections[-1]
+            last.end_char = total_chars
+            last.char_count = last.end_char - last.start_char
+    
+    @staticmethod
+    def _close_page_ranges(sections: List[DocumentSection], total_pages: int):
+        """
+        Fija end_page: cada sección termina en la página anterior al inicio
+        de la siguiente y la última en la última página
+        """
+        for section, next_section in zip(sections, islice(sections, 1, None)):
+            section.end_page = next_section.start_page - 1
+        
+        if sections:
+            sections[-1].end_page = total_pages
+    
+    def _pdf_page_texts(self, file_path: str, total_pages: int,
+                        sequential: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Devuelve el texto de todas las páginas del PDF, en orden
+        
+        La extracción es intensiva en CPU y el GIL impide repartirla entre
+        hilos, así que en PDFs largos se reparte en rangos contiguos de
+        páginas entre procesos (solo si se configuró pdf_workers > 1). Con
+        pocas páginas (el arranque del pool no compensa), un solo worker,
+        dentro de un proceso worker o si el pool falla, se consume el
+        iterable secuencial.
+        
+        El pool usa el contexto "spawn": hacer fork de un proceso con hilos
+        (analyze_many, servidores) puede dejar locks tomados en el hijo.
+        
+        Args:
+            file_path: Ruta al PDF (cada proceso lo abre por su cuenta)
+            total_pages: Número de páginas del PDF
+            sequential: Iterable que extrae las páginas en el proceso actual
+        """
+        workers = min(self.pdf_workers, total_pages // _PDF_PAGES_PER_WORKER)
+        # Un proceso worker (de este pool o de otro) no abre pools anidados
+        if workers > 1 and multiprocessing.parent_process() is None:
+            bounds = [total_pages * i // workers for i in range(workers + 1)]
+            try:
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context("spawn")) as executor:
+                    chunks = executor.map(_extract_pdf_page_range, repeat(file_path, workers),
+                                          bounds[:-1], bounds[1:])
+                    return [text for chunk in chunks for text in chunk]
+            except (OSError, BrokenProcessPool) as e:
+                self.logger.warning(f"Extracción paralela de páginas fallida, se sigue en secuencial: {e}")
+        
+        return list(sequential)
+    
+    @staticmethod
+    def _join_pdf_pages(page_texts: Iterable[Optional[str]]) -> Tuple[str, List[int]]:
+        """
+        Une el texto de las páginas (cada una seguida de "\\n") en una sola
+        pasada y calcula la tabla de offsets de inicio de página
+        
+        Returns:
+            (texto completo, page_offsets) donde page_offsets[i] es el carácter
+            en que empieza la página i+1 y el último elemento es el total
+        """
+        parts = []
+        page_offsets = [0]
+        for text in page_texts:
+            text = text or ""
+            parts.append(text)
+            parts.append("\n")
+            page_offsets.append(page_offsets[-1] + len(text) + 1)
+        
+        return "".join(parts), page_offsets
+    
+    def _extract_from_pdf_bookmarks_fitz(self, toc: List[List[Any]],
+                                         total_pages: int) -> List[DocumentSection]:
+        """
+        Extrae secciones desde la tabla de contenidos de PyMuPDF
+        
+        doc.get_toc() ya devuelve la lista plana [nivel, título, página], así
+        que basta un recorrido lineal; el padre de cada entrada es la última
+        sección vista del nivel inmediatamente superior.
+        """
+        sections = []
+        last_id_by_level: Dict[int, str] = {}
+        
+        for section_counter, (level, title, page_num) in enumerate(toc, 1):
+            # PyMuPDF usa -1 cuando el destino del bookmark no es una página
+            if page_num < 1:
+                self.logger.warning(f"Bookmark sin página de destino: {title}")
+                continue
             
-            return DocumentStructure(
-                file_path=file_path,
-                file_name=path.name,
-                file_type="pdf",
-                total_pages=total_pages,
-                total_chars=total_chars,
-                sections=sections,
-                extraction_method=extraction_method
-            )
-    
-    def _extract_from_pdf_bookmarks(self, reader: PyPDF2.PdfReader, 
+            section_id = f"section_{section_counter}"
+            sections.append(DocumentSection(
+                id=section_id,
+                title=title or f"Sección {section_counter}",
+                level=level,
+                start_page=page_num,
+                end_page=page_num,  # Se actualizará después
+                parent_id=last_id_by_level.get(level - 1)
+            ))
+            last_id_by_level[level] = section_id
+        
+        # Actualizar end_page de cada sección
+        self._close_page_ranges(sections, total_pages)
+        
+        return sections
+    
+    def _extract_from_pdf_bookmarks(self, reader: 'PyPDF2.PdfReader', 
                                    full_text: str) -> List[DocumentSection]:
         """Extrae secciones desde los bookmarks del PDF"""
         sections = []
+        section_counter = 0
         
-        def process_outline(outline, level=1, parent_id=None, section_counter=[0]):
-            """Procesa recursivamente los bookmarks"""
-            for item in outline:
-                if isinstance(item, list):
-                    # Es una lista de sub-items
-                    process_outline(item, level + 1, parent_id, section_counter)
-                else:
-                    # Es un bookmark individual
-                    section_counter[0] += 1
-                    section_id = f"section_{section_counter[0]}"
-                    
-                    try:
-                        # Obtener página del bookmark
-                        page_num = reader.get_destination_page_number(item) + 1
-                        
-                        # Obtener título
-                        title = item.title if hasattr(item, 'title') else f"Sección {section_counter[0]}"
-                        
-                        section = DocumentSection(
-                            id=section_id,
-                            title=title,
-                            level=level,
-                            start_page=page_num,
-                            end_page=page_num,  # Se actualizará después
-                            parent_id=parent_id
-                        )
-                        
-                        sections.append(section)
-                        
-                        # Procesar hijos si existen
-                        if hasattr(item, '/Kids'):
-                            process_outline(item['/Kids'], level + 1, section_id, section_counter)
-                            
-                    except Exception as e:
-                        self.logger.warning(f"Error procesando bookmark: {e}")
-                        continue
-        
-        # Procesar outline
-        process_outline(reader.outline)
+        # Recorrido en preorden con una pila explícita de (item, nivel): sin
+        # recursión, un outline muy anidado no puede agotar la pila de Python.
+        # PyPDF2 representa los hijos de un bookmark como una lista anidada que
+        # le sigue, así que el padre es el último bookmark del nivel anterior.
+        stack = deque((item, 1) for item in reversed(reader.outline))
+        last_id_by_level: Dict[int, str] = {}
+        
+        while stack:
+            item, level = stack.pop()
+            
+            if isinstance(item, list):
+                # Es una lista de sub-items
+                stack.extend((child, level + 1) for child in reversed(item))
+                continue
+            
+            # Es un bookmark individual
+            section_counter += 1
+            section_id = f"section_{section_counter}"
+            
+            try:
+                # Obtener página del bookmark
+                page_num = reader.get_destination_page_number(item) + 1
+                
+                # Obtener título
+                title = item.title if hasattr(item, 'title') else f"Sección {section_counter}"
+                
+                sections.append(DocumentSection(
+                    id=section_id,
+                    title=title,
+                    level=level,
+                    start_page=page_num,
+                    end_page=page_num,  # Se actualizará después
+                    parent_id=last_id_by_level.get(level - 1)
+                ))
+                last_id_by_level[level] = section_id
+                
+            except Exception as e:
+                self.logger.warning(f"Error procesando bookmark: {e}")
+                continue
         
         # Actualizar end_page de cada sección
-        for i, section in enumerate(sections):
-            if i < len(sections) - 1:
-                section.end_page = sections[i + 1].start_page - 1
-            else:
-                section.end_page = len(reader.pages)
+        self._close_page_ranges(sections, len(reader.pages))
         
         return sections
     
-    def _extract_from_pdf_text(self, reader: PyPDF2.PdfReader, 
-                               full_text: str) -> List[DocumentSection]:
-        """Extrae secciones analizando el texto del PDF"""
-        sections = []
+    def _extract_from_pdf_text(self, full_text: str,
+                               page_offsets: List[int]) -> List[DocumentSection]:
+        """
+        Extrae secciones analizando el texto del PDF
         
-        # Patrones comunes para detectar títulos de secciones
-        patterns = [
-            # Números con punto: "1. Título", "1.1 Título"
-            r'^(\d+(?:\.\d+)*)\s*[.\-:)]?\s+([A-ZÁÉÍÓÚÑ][^\n]{3,100})$',
-            # Capítulos: "CAPÍTULO 1", "CHAPTER 1"
-            r'^(CAP[ÍI]TULO|CHAPTER)\s+(\d+)[:\s]+([^\n]{3,100})$',
-            # Secciones: "SECCIÓN 1", "SECTION 1"
-            r'^(SECCI[ÓO]N|SECTION)\s+(\d+)[:\s]+([^\n]{3,100})$',
-            # Anexos: "ANEXO A", "APPENDIX A"
-            r'^(ANEXO|AP[ÉE]NDICE|APPENDIX)\s+([A-Z\d]+)[:\s]+([^\n]{3,100})$',
-        ]
-        
-        compiled_patterns = [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in patterns]
-        
-        lines = full_text.split('\n')
-        section_counter = 0
-        current_char = 0
+        Args:
+            full_text: Texto completo del PDF
+            page_offsets: Offsets de inicio de página (ver _join_pdf_pages),
+                usados para calcular la página de cada sección con bisect
+        """
+        sections = []
         
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                current_char += 1
-                continue
+        # Una sola pasada del motor de regex sobre todo el texto
+        for section_counter, match in enumerate(_PDF_SECTION_RE.finditer(full_text), 1):
+            current_char = match.start('heading')
+            
+            # Determinar nivel basado en la numeración
+            number = match.group('number')
+            level = number.count('.') + 1 if number else 1
             
-            # Intentar match con cada patrón
-            for pattern in compiled_patterns:
-                match = pattern.match(line)
-                if match:
-                    section_counter += 1
-                    section_id = f"section_{section_counter}"
-                    
-                    # Determinar nivel basado en la numeración
-                    if '.' in match.group(1) if len(match.groups()) > 0 else '':
-                        level = match.group(1).count('.') + 1
-                    else:
-                        level = 1
-                    
-                    # Título es el último grupo capturado
-                    title = match.group(-1).strip()
-                    
-                    section = DocumentSection(
-                        id=section_id,
-                        title=title,
-                        level=level,
-                        start_page=1,  # Se calculará mejor después
-                        end_page=1,
-                        start_char=current_char,
-                        end_char=current_char  # Se actualizará después
-                    )
-                    
-                    sections.append(section)
-                    break
+            # Título: el grupo de la alternativa que encajó
+            title = next(filter(None, match.group(*_PDF_TITLE_GROUPS))).strip()
             
-            current_char += len(line) + 1
+            # Página que contiene el título: una búsqueda binaria
+            page_num = bisect.bisect_right(page_offsets, current_char)
+            
+            sections.append(DocumentSection(
+                id=f"section_{section_counter}",
+                title=title,
+                level=level,
+                start_page=page_num,
+                end_page=page_num,  # Se actualizará después
+                start_char=current_char,
+                end_char=current_char  # Se actualizará después
+            ))
         
-        # Actualizar end_char de cada sección
-        for i, section in enumerate(sections):
-            if i < len(sections) - 1:
-                section.end_char = sections[i + 1].start_char - 1
-                section.char_count = section.end_char - section.start_char
-            else:
-                section.end_char = len(full_text)
-                section.char_count = section.end_char - section.start_char
+        # Actualizar end_char y end_page de cada sección
+        self._close_char_ranges(sections, len(full_text))
+        total_pages = len(page_offsets) - 1
+        for section in sections:
+            section.end_page = max(section.start_page,
+                                   min(bisect.bisect_right(page_offsets, section.end_char - 1), total_pages))
         
         return sections
     
     def _analyze_docx(self, file_path: str) -> DocumentStructure:
         """Analiza estructura de un DOCX"""
         if not DOCX_AVAILABLE:
-            raise ImportError("python-docx no está instalado. Ejecutar: pip3 install python-docx")
+            raise ImportError("lxml no está instalado (lectura de DOCX). Ejecutar: pip3 install python-docx")
         
         path = Path(file_path)
-        doc = DocxDocument(file_path)
-        
-        # Extraer texto completo
-        full_text = "\n".join([para.text for para in doc.paragraphs])
-        total_chars = len(full_text)
         
-        # Extraer secciones desde estilos de heading
+        # Una sola pasada por los párrafos: offsets y secciones desde estilos
+        # de heading (el texto completo es la unión de párrafos con "\n")
         sections = []
-        section_counter = 0
         current_char = 0
         
-        for para in doc.paragraphs:
-            if para.style.name.startswith('Heading'):
-                section_counter += 1
-                level = int(para.style.name.replace('Heading', '').strip() or '1')
+        for text, style_name in read_docx_paragraphs(file_path):
+            if style_name.startswith('Heading'):
+                level_text = style_name[len('Heading'):].strip()
                 
                 section = DocumentSection(
-                    id=f"section_{section_counter}",
-                    title=para.text,
-                    level=level,
+                    id=f"section_{len(sections) + 1}",
+                    title=text,
+                    level=int(level_text) if level_text.isdecimal() else 1,
                     start_page=1,  # DOCX no tiene concepto de páginas fácilmente accesible
                     end_page=1,
                     start_char=current_char,
@@ -347,16 +860,12 @@ class DocumentStructureAnalyzer:
                 
                 sections.append(section)
             
-            current_char += len(para.text) + 1
+            current_char += len(text) + 1
+        
+        total_chars = max(current_char - 1, 0)
         
         # Actualizar end_char
-        for i, section in enumerate(sections):
-            if i < len(sections) - 1:
-                section.end_char = sections[i + 1].start_char - 1
-                section.char_count = section.end_char - section.start_char
-            else:
-                section.end_char = total_chars
-                section.char_count = section.end_char - section.start_char
+        self._close_char_ranges(sections, total_chars)
         
         return DocumentStructure(
             file_path=file_path,
@@ -372,13 +881,23 @@ class DocumentStructureAnalyzer:
         """Analiza estructura de un archivo de texto plano"""
         path = Path(file_path)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            full_text = f.read()
+        # Decodificar los bytes tal cual (sin traducir \r\n) para que las
+        # posiciones de caracteres correspondan exactamente con el archivo.
+        # Se decodifica directamente desde un mmap: el contenido no se copia
+        # a un objeto bytes intermedio, solo existe el str resultante.
+        with open(file_path, 'rb') as f:
+            total_bytes = os.fstat(f.fileno()).st_size
+            if total_bytes:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    full_text = str(mapped, 'utf-8')
+            else:
+                full_text = ''  # mmap no admite archivos vacíos
         
         total_chars = len(full_text)
         
         # Para archivos de texto, usar análisis similar al PDF
         sections = self._extract_sections_from_text(full_text)
+        self._set_byte_offsets(sections, full_text, ascii_only=total_bytes == total_chars)
         
         return DocumentStructure(
             file_path=file_path,
@@ -390,64 +909,74 @@ class DocumentStructureAnalyzer:
             extraction_method="text_analysis"
         )
     
-    def _extract_sections_from_text(self, text: str) -> List[DocumentSection]:
-        """Extrae secciones de texto plano"""
-        # Similar a _extract_from_pdf_text pero sin el reader
-        sections = []
+    @staticmethod
+    def _set_byte_offsets(sections: List[DocumentSection], text: str, ascii_only: bool):
+        """
+        Calcula start_byte/end_byte de cada sección a partir de sus posiciones
+        de caracteres, para poder leer una sección con seek+read sin cargar
+        el archivo completo.
         
-        patterns = [
-            r'^(\d+(?:\.\d+)*)\s*[.\-:)]?\s+([A-ZÁÉÍÓÚÑ][^\n]{3,100})$',
-            r'^(CAP[ÍI]TULO|CHAPTER)\s+(\d+)[:\s]+([^\n]{3,100})$',
-            r'^(SECCI[ÓO]N|SECTION)\s+(\d+)[:\s]+([^\n]{3,100})$',
-            r'^(ANEXO|AP[ÉE]NDICE|APPENDIX)\s+([A-Z\d]+)[:\s]+([^\n]{3,100})$',
-            # Títulos en mayúsculas
-            r'^([A-ZÁÉÍÓÚÑ\s]{5,50})$',
-        ]
+        Args:
+            sections: Secciones con start_char/end_char ya calculados
+            text: Texto completo del archivo
+            ascii_only: True si cada carácter ocupa un byte (offsets idénticos)
+        """
+        positions = sorted({pos for section in sections
+                            for pos in (section.start_char, section.end_char)})
         
-        compiled_patterns = [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in patterns]
+        if ascii_only:
+            byte_offsets = {pos: pos for pos in positions}
+        else:
+            # Recorrido incremental: cada tramo del texto se codifica una sola vez
+            byte_offsets = {}
+            prev_char = prev_byte = 0
+            for pos in positions:
+                prev_byte += len(text[prev_char:pos].encode('utf-8'))
+                prev_char = pos
+                byte_offsets[pos] = prev_byte
         
-        lines = text.split('\n')
-        section_counter = 0
-        current_char = 0
+        for section in sections:
+            section.start_byte = byte_offsets[section.start_char]
+            section.end_byte = byte_offsets[section.end_char]
+    
+    def _extract_sections_from_text(self, text: str) -> List[DocumentSection]:
+        """Extrae secciones de texto plano"""
+        # Similar a _extract_from_pdf_text pero con una sola pasada
+        # del motor de regex sobre todo el texto en lugar de línea a línea
+        sections = []
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                current_char += 1
-                continue
-            
-            for pattern in compiled_patterns:
-                match = pattern.match(line)
-                if match:
-                    section_counter += 1
-                    
-                    section = DocumentSection(
-                        id=f"section_{section_counter}",
-                        title=line,
-                        level=1,
-                        start_page=1,
-                        end_page=1,
-                        start_char=current_char,
-                        end_char=current_char
-                    )
-                    
-                    sections.append(section)
-                    break
-            
-            current_char += len(line) + 1
+        for section_counter, match in enumerate(_TEXT_HEADER_RE.finditer(text), 1):
+            sections.append(DocumentSection(
+                id=f"section_{section_counter}",
+                title=match.group('title'),
+                level=1,
+                start_page=1,
+                end_page=1,
+                start_char=match.start('title'),
+                end_char=match.start('title')
+            ))
         
         # Actualizar end_char
-        for i, section in enumerate(sections):
-            if i < len(sections) - 1:
-                section.end_char = sections[i + 1].start_char - 1
-                section.char_count = section.end_char - section.start_char
-            else:
-                section.end_char = len(text)
-                section.char_count = section.end_char - section.start_char
+        self._close_char_ranges(sections, len(text))
         
         return sections
 
 
+_shared_analyzers: Dict[Optional[str], DocumentStructureAnalyzer] = {}
+
+
+def get_analyzer(cache_dir: Optional[str] = None) -> DocumentStructureAnalyzer:
+    """
+    Obtiene la instancia compartida del analizador (una por directorio de
+    cache en disco; sin cache_dir solo se cachea en memoria)
+    """
+    analyzer = _shared_analyzers.get(cache_dir)
+    if analyzer is None:
+        analyzer = _shared_analyzers.setdefault(cache_dir, DocumentStructureAnalyzer(cache_dir=cache_dir))
+    
+    return analyzer
+
+
 def main():
     """Función de prueba"""
     import sys
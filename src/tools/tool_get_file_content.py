@@ -5,7 +5,9 @@ Reconstruye archivos completos desde chunks indexados, manejando overlaps.
 """
 
 import argparse
+import itertools
 import json
+import re
 import sys
 from typing import Dict, List, Any, Optional
 
@@ -19,7 +21,7 @@ from common.common import (
     Config, OpenSearchClient, Logger,
     handle_search_error, log_search_metrics, validate_parameters,
     get_cache, ValidationError, find_overlap_length, calculate_text_similarity,
-    remove_duplicate_chunks_by_hash
+    remove_duplicate_chunks_by_hash, MAX_OVERLAP_LENGTH
 )
 
 # Importar herramientas de acceso progresivo
@@ -29,6 +31,28 @@ try:
 except ImportError:
     PROGRESSIVE_ACCESS_AVAILABLE = False
 
+# Patrones para detectar títulos/secciones, en orden de prioridad. Se aplican
+# con match sobre líneas sueltas, así que no necesitan MULTILINE
+_SECTION_PATTERNS = (
+    # Números con punto: "1. Título", "1.1 Título"
+    (r'^(?P<number>\d+(?:\.\d+)*)\s*[.\-:)]?\s+(?P<number_title>[A-ZÁÉÍÓÚÑ][^\n]{3,100})$', 'numbered'),
+    # Capítulos: "CAPÍTULO 1", "CHAPTER 1"
+    (r'^(CAP[ÍI]TULO|CHAPTER)\s+(\d+)[:\s]+([^\n]{3,100})$', 'chapter'),
+    # Secciones: "SECCIÓN 1", "SECTION 1"
+    (r'^(SECCI[ÓO]N|SECTION)\s+(\d+)[:\s]+([^\n]{3,100})$', 'section'),
+    # Anexos: "ANEXO A", "APPENDIX A"
+    (r'^(ANEXO|AP[ÉE]NDICE|APPENDIX)\s+([A-Z\d]+)[:\s]+([^\n]{3,100})$', 'appendix'),
+    # Títulos en mayúsculas (al menos 5 palabras)
+    (r'^([A-ZÁÉÍÓÚÑ\s]{10,80})$', 'title'),
+)
+
+# Una sola alternancia con un grupo por tipo: match.lastgroup indica qué
+# patrón encajó (el primero en orden, como al probarlos uno a uno)
+_SECTION_RE = re.compile(
+    '|'.join(f'(?P<{section_type}>{pattern})' for pattern, section_type in _SECTION_PATTERNS),
+    re.IGNORECASE
+)
+
 class GetFileContent:
     """Clase principal para obtener contenido de archivos"""
     
@@ -93,6 +117,9 @@ class GetFileContent:
             # 3. Ordenar chunks
             chunks = sorted(all_chunks, key=lambda x: x['_source'].get('chunk_id', 0))
             
+            # Longitud de cada chunk, calculada una sola vez para todos los pasos
+            content_lengths = [len(chunk['_source'].get('content', '')) for chunk in chunks]
+            
             # 4. Verificar si el archivo es muy grande y si el acceso progresivo está habilitado
             max_length = self.defaults.get('max_content_length_for_full_retrieval', 50000)
             enable_progressive = self.defaults.get('enable_progressive_access', True)
@@ -102,15 +129,16 @@ class GetFileContent:
                 structure_from_s3 = self._load_structure_from_s3(file_path, chunks)
                 if structure_from_s3:
                     self.logger.info(f"Estructura cargada desde S3 para: {file_path}")
-                    return self._format_structure_response(original_file_path, chunks, structure_from_s3, include_metadata)
+                    return self._format_structure_response(original_file_path, chunks, content_lengths,
+                                                           structure_from_s3, include_metadata)
             
             # 6. Calcular longitud total estimada
-            total_length = sum(len(chunk['_source'].get('content', '')) for chunk in chunks)
+            total_length = sum(content_lengths)
             
             # 7. Si el archivo es grande y el acceso progresivo está habilitado, devolver estructura
             if enable_progressive and total_length > max_length and PROGRESSIVE_ACCESS_AVAILABLE:
                 self.logger.info(f"Archivo {original_file_path} es grande ({total_length} chars). Usando acceso progresivo.")
-                return self._get_document_structure(original_file_path, chunks, include_metadata)
+                return self._get_document_structure(original_file_path, chunks, content_lengths, include_metadata)
             
             # 6. Si el archivo es pequeño o el acceso progresivo está deshabilitado, devolver contenido completo
             full_content = self._reconstruct_content_with_overlap_handling(chunks)
@@ -145,8 +173,8 @@ class GetFileContent:
             self.logger.error(f"Error al obtener contenido del archivo: {str(e)}")
             raise
     
-    def _get_document_structure(self, file_path: str, chunks: List[Dict], 
-                               include_metadata: bool) -> Dict[str, Any]:
+    def _get_document_structure(self, file_path: str, chunks: List[Dict],
+                               content_lengths: List[int], include_metadata: bool) -> Dict[str, Any]:
         """
         Obtiene la estructura del documento para acceso progresivo.
         OPTIMIZADO: Analiza estructura desde chunks sin reconstruir contenido completo.
@@ -154,17 +182,18 @@ class GetFileContent:
         Args:
             file_path: Nombre del archivo
             chunks: Lista de chunks del documento
+            content_lengths: Longitud del contenido de cada chunk
             include_metadata: Si incluir metadatos
             
         Returns:
             Dict con la estructura del documento
         """
+        # Longitud total estimada SIN reconstruir el contenido
+        total_length = sum(content_lengths)
+        
         try:
-            # Calcular longitud total estimada SIN reconstruir el contenido
-            total_length = sum(len(chunk['_source'].get('content', '')) for chunk in chunks)
-            
             # Analizar estructura desde los chunks directamente
-            structure = self._analyze_structure_from_chunks(chunks)
+            structure = self._analyze_structure_from_chunks(chunks, content_lengths)
             
             # Preparar resultado con estructura
             result = {
@@ -206,7 +235,6 @@ class GetFileContent:
         except Exception as e:
             self.logger.error(f"Error obteniendo estructura del documento: {str(e)}")
             # Fallback simplificado: devolver información básica sin contenido
-            total_length = sum(len(chunk['_source'].get('content', '')) for chunk in chunks)
             return {
                 "file_path": file_path,
                 "access_mode": "progressive",
@@ -238,19 +266,18 @@ class GetFileContent:
                 "note": f"Error analyzing structure: {str(e)}. Use chunk ranges for access."
             }
     
-    def _analyze_structure_from_chunks(self, chunks: List[Dict]) -> Dict[str, Any]:
+    def _analyze_structure_from_chunks(self, chunks: List[Dict], content_lengths: List[int]) -> Dict[str, Any]:
         """
         Analiza la estructura del documento desde los chunks sin reconstruir contenido completo.
         OPTIMIZADO: Solo analiza los primeros chunks para detectar estructura rápidamente.
         
         Args:
             chunks: Lista de chunks del documento
+            content_lengths: Longitud del contenido de cada chunk
             
         Returns:
             Dict con la estructura del documento
         """
-        import re
-        
         # Analizar solo los primeros N chunks para detectar estructura (más rápido)
         sample_size = min(20, len(chunks))
         sample_chunks = chunks[:sample_size]
@@ -258,22 +285,6 @@ class GetFileContent:
         sections = []
         chunk_ranges = []
         
-        # Patrones para detectar títulos/secciones
-        patterns = [
-            # Números con punto: "1. Título", "1.1 Título"
-            (r'^(\d+(?:\.\d+)*)\s*[.\-:)]?\s+([A-ZÁÉÍÓÚÑ][^\n]{3,100})$', 'numbered'),
-            # Capítulos: "CAPÍTULO 1", "CHAPTER 1"
-            (r'^(CAP[ÍI]TULO|CHAPTER)\s+(\d+)[:\s]+([^\n]{3,100})$', 'chapter'),
-            # Secciones: "SECCIÓN 1", "SECTION 1"
-            (r'^(SECCI[ÓO]N|SECTION)\s+(\d+)[:\s]+([^\n]{3,100})$', 'section'),
-            # Anexos: "ANEXO A", "APPENDIX A"
-            (r'^(ANEXO|AP[ÉE]NDICE|APPENDIX)\s+([A-Z\d]+)[:\s]+([^\n]{3,100})$', 'appendix'),
-            # Títulos en mayúsculas (al menos 5 palabras)
-            (r'^([A-ZÁÉÍÓÚÑ\s]{10,80})$', 'title'),
-        ]
-        
-        compiled_patterns = [(re.compile(p, re.MULTILINE | re.IGNORECASE), t) for p, t in patterns]
-        
         section_counter = 0
         
         # Analizar chunks de muestra
@@ -288,60 +299,66 @@ class GetFileContent:
                 if len(line) < 5:
                     continue
                 
-                # Intentar match con cada patrón
-                for pattern, section_type in compiled_patterns:
-                    match = pattern.match(line)
-                    if match:
-                        section_counter += 1
-                        
-                        # Extraer título
-                        if section_type == 'numbered':
-                            section_num = match.group(1)
-                            title = f"{section_num}. {match.group(2)}"
-                            level = section_num.count('.') + 1
-                        elif section_type in ['chapter', 'section', 'appendix']:
-                            title = line
-                            level = 1
-                        else:  # title
-                            title = line
-                            level = 1
-                        
-                        sections.append({
-                            "id": f"section_{section_counter}",
-                            "title": title[:100],  # Limitar longitud
-                            "level": level,
-                            "chunk_start": chunk_id,
-                            "chunk_end": chunk_id,  # Se actualizará si es necesario
-                            "type": section_type
-                        })
-                        break
+                # Un único match por línea: gana el primer patrón que encaja
+                match = _SECTION_RE.match(line)
+                if match:
+                    section_counter += 1
+                    section_type = match.lastgroup
+                    
+                    # Extraer título
+                    if section_type == 'numbered':
+                        section_num = match.group('number')
+                        title = f"{section_num}. {match.group('number_title')}"
+                        level = section_num.count('.') + 1
+                    elif section_type in ['chapter', 'section', 'appendix']:
+                        title = line
+                        level = 1
+                    else:  # title
+                        title = line
+                        level = 1
+                    
+                    sections.append({
+                        "id": f"section_{section_counter}",
+                        "title": title[:100],  # Limitar longitud
+                        "level": level,
+                        "chunk_start": chunk_id,
+                        "chunk_end": chunk_id,  # Se actualizará si es necesario
+                        "type": section_type
+                    })
         
-        # Crear rangos de chunks sugeridos
+        # Crear rangos de chunks sugeridos. Con las sumas acumuladas de
+        # longitudes, los caracteres de cualquier rango salen en O(1)
         total_chunks = len(chunks)
+        prefix_chars = list(itertools.accumulate(content_lengths, initial=0))
+        
+        def range_chars(start: int, end: int) -> int:
+            """Caracteres de los chunks con índice en [start, end)"""
+            return prefix_chars[end] - prefix_chars[start] if end > start else 0
+        
         chunk_ranges = [
             {
                 "description": "Inicio del documento (primeros 10 chunks)",
                 "chunk_start": 1,
                 "chunk_end": min(10, total_chunks),
-                "estimated_chars": sum(len(chunks[i]['_source'].get('content', '')) for i in range(min(10, total_chunks)))
+                "estimated_chars": range_chars(0, min(10, total_chunks))
             },
             {
                 "description": "Primera mitad del documento",
                 "chunk_start": 1,
                 "chunk_end": total_chunks // 2,
-                "estimated_chars": sum(len(chunks[i]['_source'].get('content', '')) for i in range(total_chunks // 2))
+                "estimated_chars": range_chars(0, total_chunks // 2)
             },
             {
                 "description": "Segunda mitad del documento",
                 "chunk_start": total_chunks // 2 + 1,
                 "chunk_end": total_chunks,
-                "estimated_chars": sum(len(chunks[i]['_source'].get('content', '')) for i in range(total_chunks // 2, total_chunks))
+                "estimated_chars": range_chars(total_chunks // 2, total_chunks)
             },
             {
                 "description": "Final del documento (últimos 10 chunks)",
                 "chunk_start": max(1, total_chunks - 9),
                 "chunk_end": total_chunks,
-                "estimated_chars": sum(len(chunks[i]['_source'].get('content', '')) for i in range(max(0, total_chunks - 10), total_chunks))
+                "estimated_chars": range_chars(max(0, total_chunks - 10), total_chunks)
             }
         ]
         
@@ -370,8 +387,7 @@ class GetFileContent:
                         "chunk_end": end_chunk,
                         "page_start": start_page,
                         "page_end": end_page,
-                        "estimated_chars": sum(len(chunks[i]['_source'].get('content', '')) 
-                                             for i in range(max(0, start_chunk-1), min(end_chunk, total_chunks)))
+                        "estimated_chars": range_chars(max(0, start_chunk-1), min(end_chunk, total_chunks))
                     })
         
         return {
@@ -522,27 +538,31 @@ class GetFileContent:
     
     def _reconstruct_by_position(self, chunks: List[Dict]) -> str:
         """Reconstruye usando información de posición de caracteres"""
-        content_map = {}
+        # Recorrer los chunks por posición de inicio (orden estable ante empates)
+        # y añadir de cada uno solo lo que queda más allá de lo ya cubierto
+        ordered = sorted(chunks, key=lambda chunk: chunk['_source'].get('chunk_start', 0))
         
-        for chunk in chunks:
+        parts = []
+        cursor = None
+        for chunk in ordered:
             source = chunk['_source']
             start = source.get('chunk_start', 0)
             content = source['content']
+            if not content:
+                continue
             
-            # Mapear cada posición al contenido correspondiente
-            for i, char in enumerate(content):
-                pos = start + i
-                if pos not in content_map:  # Evitar sobrescribir
-                    content_map[pos] = char
-        
-        # Reconstruir en orden de posición
-        if content_map:
-            max_pos = max(content_map.keys())
-            result = []
-            for i in range(max_pos + 1):
-                if i in content_map:
-                    result.append(content_map[i])
-            return ''.join(result)
+            if cursor is None or start >= cursor:
+                # Sin solapamiento: los huecos entre chunks no aportan caracteres
+                parts.append(content)
+            elif start + len(content) > cursor:
+                # Evitar duplicar el prefijo que ya cubrió un chunk anterior
+                parts.append(content[cursor - start:])
+            else:
+                continue
+            cursor = start + len(content)
+        
+        if parts:
+            return ''.join(parts)
         
         # Fallback si no hay posiciones válidas
         return self._reconstruct_by_overlap_detection(chunks)
@@ -552,8 +572,10 @@ class GetFileContent:
         if not chunks:
             return ""
         
-        # Comenzar con el primer chunk
-        result_content = chunks[0]['_source']['content']
+        # Comenzar con el primer chunk. Las partes se unen una sola vez al
+        # final; para detectar overlaps basta con la cola del contenido
+        parts = [chunks[0]['_source']['content']]
+        tail = parts[0][-MAX_OVERLAP_LENGTH:]
         
         min_overlap = self.defaults.get('min_overlap', 50)
         similarity_threshold = self.defaults.get('similarity_threshold', 0.85)
@@ -562,22 +584,25 @@ class GetFileContent:
             current_chunk = chunks[i]['_source']['content']
             
             # Buscar overlap entre el final del contenido actual y el inicio del nuevo chunk
-            overlap_length = find_overlap_length(result_content, current_chunk, min_overlap)
+            overlap_length = find_overlap_length(tail, current_chunk, min_overlap)
             
             if overlap_length > 0:
                 # Hay overlap, añadir solo la parte no duplicada
                 unique_part = current_chunk[overlap_length:]
-                result_content += unique_part
+                parts.append(unique_part)
+                tail = (tail + unique_part)[-MAX_OVERLAP_LENGTH:]
                 # Logging reducido: solo loggear overlaps grandes
                 if overlap_length > 500:
                     self.logger.debug(f"Overlap grande detectado: {overlap_length} caracteres en chunk {i}")
             else:
                 # No hay overlap detectado, añadir separador y contenido completo
-                if not result_content.endswith('\n'):
-                    result_content += '\n'
-                result_content += current_chunk
+                if not tail.endswith('\n'):
+                    parts.append('\n')
+                    tail += '\n'
+                parts.append(current_chunk)
+                tail = (tail + current_chunk)[-MAX_OVERLAP_LENGTH:]
         
-        return result_content
+        return ''.join(parts)
     
     def _load_structure_from_s3(self, file_path: str, chunks: List[Dict] = None) -> Optional[Dict[str, Any]]:
         """
@@ -641,7 +666,7 @@ class GetFileContent:
             self.logger.debug(f"No se pudo cargar estructura desde S3 para {file_path}: {str(e)}")
             return None
     
-    def _format_structure_response(self, file_path: str, chunks: List[Dict],
+    def _format_structure_response(self, file_path: str, chunks: List[Dict], content_lengths: List[int],
                                    structure: Dict[str, Any], include_metadata: bool) -> Dict[str, Any]:
         """
         Formatea la respuesta con estructura pre-calculada desde S3.
@@ -649,6 +674,7 @@ class GetFileContent:
         Args:
             file_path: Nombre del archivo
             chunks: Lista de chunks del documento
+            content_lengths: Longitud del contenido de cada chunk
             structure: Estructura pre-calculada
             include_metadata: Si incluir metadatos
             
@@ -663,7 +689,7 @@ class GetFileContent:
         
         # Fallback: si no hay metadata, calcular (pero esto debería ser raro)
         if total_length == 0:
-            total_length = sum(len(chunk['_source'].get('content', '')) for chunk in chunks)
+            total_length = sum(content_lengths)
         
         result = {
             "file_path": file_path,
@@ -6,8 +6,11 @@ Permite acceso progresivo a contenido de archivos en OpenSearch/S3.
 
 import argparse
 import json
+import mmap
+import os
 import sys
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 import logging
 
@@ -16,30 +19,40 @@ from common.common import Config, OpenSearchClient
 import boto3
 
 # Importar el analizador de estructura
-from tools.document_structure_analyzer import DocumentStructureAnalyzer, DocumentStructure
+from tools.document_structure_analyzer import (
+    DOCX_AVAILABLE, DocumentStructure, get_analyzer, read_docx_paragraphs
+)
 
 try:
-    import PyPDF2
-    PDF_AVAILABLE = True
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
 except ImportError:
-    PDF_AVAILABLE = False
+    FITZ_AVAILABLE = False
 
 try:
-    from docx import Document as DocxDocument
-    DOCX_AVAILABLE = True
+    import PyPDF2
+    PDF_AVAILABLE = True
 except ImportError:
-    DOCX_AVAILABLE = False
+    PDF_AVAILABLE = False
 
 
 class GetFileSection:
     """Clase para obtener secciones específicas de documentos desde OpenSearch/S3"""
     
+    # Número máximo de archivos mapeados en memoria a la vez
+    MMAP_CACHE_SIZE = 32
+    
     def __init__(self, config_path: str = "config/config.yaml", app_name: str = None):
         self.logger = logging.getLogger(__name__)
-        self.analyzer = DocumentStructureAnalyzer()
+        
+        # Archivos de texto mapeados en memoria: ruta -> ((mtime_ns, tamaño), mmap)
+        self._mmap_cache: "OrderedDict[str, Tuple[Tuple[int, int], mmap.mmap]]" = OrderedDict()
         
         # Cargar configuración
         self.config = Config(config_path)
+        
+        # El cache en disco de estructuras solo se usa si se configura su directorio
+        self.analyzer = get_analyzer(self.config.get('defaults.get_file_section.structure_cache_dir'))
         self.app_name = app_name or self.config.config.get('app', {}).get('name', 'darwin')
         
         # Inicializar clientes
@@ -487,42 +500,44 @@ class GetFileSection:
     
     def _extract_pdf_section(self, file_path: str, section: Any) -> str:
         """Extrae contenido de una sección de PDF"""
+        # Si tenemos información de caracteres, usar eso
+        if section.start_char is not None and section.end_char is not None:
+            # Mismo texto (motor y separadores) que usó el analizador
+            full_text = "".join(page + "\n" for page in self._read_pdf_pages(file_path))
+            
+            # Retornar la sección específica
+            return full_text[section.start_char:section.end_char]
+        
+        # Si solo tenemos páginas, extraer por páginas
+        pages = self._read_pdf_pages(file_path, section.start_page - 1, section.end_page)
+        return "".join(page + "\n" for page in pages)
+    
+    def _read_pdf_pages(self, file_path: str, start_page: int = 0,
+                        end_page: Optional[int] = None) -> List[str]:
+        """
+        Devuelve el texto de las páginas [start_page, end_page) del PDF
+        (índices base 0), con PyMuPDF si está disponible o con PyPDF2
+        """
+        if FITZ_AVAILABLE:
+            with fitz.open(file_path) as doc:
+                end = doc.page_count if end_page is None else min(end_page, doc.page_count)
+                return [doc[page_num].get_text("text") for page_num in range(start_page, end)]
+        
         if not PDF_AVAILABLE:
-            raise ImportError("PyPDF2 no está instalado")
+            raise ImportError("PyMuPDF no está instalado")
         
         with open(file_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
-            
-            # Si tenemos información de caracteres, usar eso
-            if section.start_char is not None and section.end_char is not None:
-                # Extraer todo el texto
-                full_text = ""
-                for page in reader.pages:
-                    full_text += page.extract_text() + "\n"
-                
-                # Retornar la sección específica
-                return full_text[section.start_char:section.end_char]
-            
-            # Si solo tenemos páginas, extraer por páginas
-            else:
-                content = ""
-                start_page = section.start_page - 1  # PyPDF2 usa índice 0
-                end_page = section.end_page
-                
-                for page_num in range(start_page, min(end_page, len(reader.pages))):
-                    content += reader.pages[page_num].extract_text() + "\n"
-                
-                return content
+            end = len(reader.pages) if end_page is None else min(end_page, len(reader.pages))
+            return [reader.pages[page_num].extract_text() for page_num in range(start_page, end)]
     
     def _extract_docx_section(self, file_path: str, section: Any) -> str:
         """Extrae contenido de una sección de DOCX"""
         if not DOCX_AVAILABLE:
-            raise ImportError("python-docx no está instalado")
+            raise ImportError("lxml no está instalado (lectura de DOCX)")
         
-        doc = DocxDocument(file_path)
-        
-        # Extraer texto completo
-        full_text = "\n".join([para.text for para in doc.paragraphs])
+        # Extraer texto completo (mismos párrafos que usó el analizador)
+        full_text = "\n".join(text for text, _ in read_docx_paragraphs(file_path))
         
         # Usar posiciones de caracteres si están disponibles
         if section.start_char is not None and section.end_char is not None:
@@ -533,13 +548,58 @@ class GetFileSection:
     
     def _extract_text_section(self, file_path: str, section: Any) -> str:
         """Extrae contenido de una sección de archivo de texto"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            full_text = f.read()
+        # Con offsets en bytes se lee solo la sección desde el archivo mapeado
+        if getattr(section, 'start_byte', None) is not None and getattr(section, 'end_byte', None) is not None:
+            mm = self._get_mmap(file_path)
+            if mm is not None:
+                return mm[section.start_byte:section.end_byte].decode('utf-8', errors='replace')
+            
+            with open(file_path, 'rb') as f:
+                f.seek(section.start_byte)
+                data = f.read(section.end_byte - section.start_byte)
+            return data.decode('utf-8', errors='replace')
+        
+        # Sin offsets en bytes, leer solo hasta el final de la sección
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            if section.start_char is not None and section.end_char is not None:
+                return f.read(section.end_char)[section.start_char:]
+            
+            return f.read()
+    
+    def _get_mmap(self, file_path: str) -> Optional[mmap.mmap]:
+        """
+        Devuelve el archivo mapeado en memoria (solo lectura), reutilizando el
+        mapeo mientras el archivo no cambie. Mantiene como mucho
+        MMAP_CACHE_SIZE archivos mapeados, cerrando el más antiguo.
         
-        if section.start_char is not None and section.end_char is not None:
-            return full_text[section.start_char:section.end_char]
+        Returns:
+            mmap del archivo o None si no se puede mapear (p. ej. archivo vacío)
+        """
+        stat = os.stat(file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        
+        cached = self._mmap_cache.get(file_path)
+        if cached is not None:
+            cached_version, mm = cached
+            if cached_version == version:
+                self._mmap_cache.move_to_end(file_path)
+                return mm
+            del self._mmap_cache[file_path]
+            mm.close()
         
-        return full_text
+        try:
+            with open(file_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"No se pudo mapear {file_path}: {e}")
+            return None
+        
+        self._mmap_cache[file_path] = (version, mm)
+        if len(self._mmap_cache) > self.MMAP_CACHE_SIZE:
+            _, (_, oldest) = self._mmap_cache.popitem(last=False)
+            oldest.close()
+        
+        return mm
     
     def _get_section_context(
         self,
@@ -6,15 +6,19 @@ Búsqueda textual tradicional basada en coincidencias exactas de palabras y tér
 
 import argparse
 import json
+import logging
 import sys
 from typing import Dict, List, Any, Optional
 
 from common.common import (
     Config, OpenSearchClient, Logger,
     handle_search_error, log_search_metrics, validate_parameters,
-    get_cache, ValidationError
+    get_cache, make_cache_key, ValidationError
 )
 
+# Campos sobre los que se permite buscar
+_VALID_FIELDS = frozenset({'content', 'file_name', 'metadata.summary'})
+
 class LexicalSearch:
     """Clase principal para búsqueda léxica"""
     
@@ -30,13 +34,23 @@ class LexicalSearch:
         # Configuración específica
         self.index_name = self.config.get('opensearch.index_name')
         self.defaults = self.config.get('defaults.lexical_search', {})
+        
+        # Valores por defecto resueltos una sola vez
+        self._default_fields = self.defaults.get('fields', ['content'])
+        self._default_operator = self.defaults.get('operator', 'OR')
+        self._default_top_k = self.defaults.get('top_k', 10)
+        self._default_fuzzy = self.defaults.get('fuzzy', False)
+        self._default_include_content = self.defaults.get('include_content', True)
+        self._default_fragment_size = self.defaults.get('fragment_size', 150)
+        self._default_number_of_fragments = self.defaults.get('number_of_fragments', 3)
     
     @handle_search_error
     @log_search_metrics
     @validate_parameters(['query'])
     def search(self, query: str, fields: Optional[List[str]] = None,
                operator: Optional[str] = None, top_k: Optional[int] = None,
-               fuzzy: Optional[bool] = None) -> Dict[str, Any]:
+               fuzzy: Optional[bool] = None,
+               include_content: Optional[bool] = None) -> Dict[str, Any]:
         """
         Realiza búsqueda léxica usando BM25.
         
@@ -46,53 +60,63 @@ class LexicalSearch:
             operator: Operador lógico "AND" | "OR"
             top_k: Número de resultados
             fuzzy: Permitir coincidencias aproximadas
+            include_content: Devolver el contenido completo de cada chunk
+                (los highlights ya incluyen los fragmentos coincidentes)
             
         Returns:
             Dict con resultados de la búsqueda
         """
+        # El volcado detallado de parámetros solo se formatea si se va a emitir
+        verbose = self.logger.isEnabledFor(logging.DEBUG)
+        
         # Log de entrada con parámetros recibidos
-        self.logger.info("="*80)
-        self.logger.info("🔍 ENTRADA A BÚSQUEDA LÉXICA")
-        self.logger.info("="*80)
-        self.logger.info(f"📝 Query recibida: '{query}'")
-        self.logger.info(f"📋 Fields recibidos: {fields}")
-        self.logger.info(f"🔧 Operator recibido: {operator}")
-        self.logger.info(f"🔢 Top_k recibido: {top_k}")
-        self.logger.info(f"🎯 Fuzzy recibido: {fuzzy}")
-        self.logger.info("-"*80)
+        if verbose:
+            self.logger.debug("="*80)
+            self.logger.debug("🔍 ENTRADA A BÚSQUEDA LÉXICA")
+            self.logger.debug("="*80)
+            self.logger.debug(f"📝 Query recibida: '{query}'")
+            self.logger.debug(f"📋 Fields recibidos: {fields}")
+            self.logger.debug(f"🔧 Operator recibido: {operator}")
+            self.logger.debug(f"🔢 Top_k recibido: {top_k}")
+            self.logger.debug(f"🎯 Fuzzy recibido: {fuzzy}")
+            self.logger.debug("-"*80)
         
         # Aplicar valores por defecto
-        fields = fields or self.defaults.get('fields', ['content'])
-        operator = operator or self.defaults.get('operator', 'OR')
-        top_k = top_k or self.defaults.get('top_k', 10)
-        fuzzy = fuzzy if fuzzy is not None else self.defaults.get('fuzzy', False)
+        fields = fields or self._default_fields
+        operator = operator or self._default_operator
+        top_k = top_k or self._default_top_k
+        fuzzy = fuzzy if fuzzy is not None else self._default_fuzzy
+        if include_content is None:
+            include_content = self._default_include_content
         
         # Log de parámetros finales después de aplicar defaults
-        self.logger.info("📊 PARÁMETROS FINALES (después de defaults):")
-        self.logger.info(f"   Query: '{query}'")
-        self.logger.info(f"   Fields: {fields}")
-        self.logger.info(f"   Operator: {operator}")
-        self.logger.info(f"   Top_k: {top_k}")
-        self.logger.info(f"   Fuzzy: {fuzzy}")
-        self.logger.info("="*80)
+        if verbose:
+            self.logger.debug("📊 PARÁMETROS FINALES (después de defaults):")
+            self.logger.debug(f"   Query: '{query}'")
+            self.logger.debug(f"   Fields: {fields}")
+            self.logger.debug(f"   Operator: {operator}")
+            self.logger.debug(f"   Top_k: {top_k}")
+            self.logger.debug(f"   Fuzzy: {fuzzy}")
+            self.logger.debug("="*80)
         
         # Validar parámetros
         if not isinstance(query, str) or len(query.strip()) == 0:
             raise ValidationError("Query debe ser una cadena no vacía")
         
-        if operator not in ['AND', 'OR']:
+        if operator not in ('AND', 'OR'):
             raise ValidationError("operator debe ser 'AND' o 'OR'")
         
         if top_k <= 0 or top_k > 1000:
             raise ValidationError("top_k debe estar entre 1 y 1000")
         
-        valid_fields = ['content', 'file_name', 'metadata.summary']
         for field in fields:
-            if field not in valid_fields:
-                raise ValidationError(f"Campo inválido: {field}. Campos válidos: {valid_fields}")
+            if field not in _VALID_FIELDS:
+                raise ValidationError(f"Campo inválido: {field}. Campos válidos: {sorted(_VALID_FIELDS)}")
         
         # Verificar cache
-        cache_key = f"lexical:{hash(query)}:{str(fields)}:{operator}:{top_k}:{fuzzy}"
+        # Clave estable entre procesos; el orden de los campos no cambia el resultado
+        cache_key = make_cache_key("lexical", query, sorted(fields), operator, top_k, fuzzy,
+                                   include_content)
         if self.cache:
             cached_result = self.cache.get(cache_key)
             if cached_result:
@@ -112,16 +136,22 @@ class LexicalSearch:
             if fuzzy:
                 query_config["fuzziness"] = "AUTO"
             
-            # 3. Construir búsqueda con highlighting
+            # 3. Construir búsqueda con highlighting; no se cuenta el total de
+            #    coincidencias y 'content' solo viaja si se ha pedido
+            source_fields = ["file_name", "metadata", "chunk_id"]
+            if include_content:
+                source_fields.append("content")
+            
             search_body = {
                 "size": top_k,
                 "query": {"multi_match": query_config},
-                "_source": ["content", "file_name", "metadata", "chunk_id"],
+                "_source": source_fields,
+                "track_total_hits": False,
                 "highlight": {
                     "fields": {
                         field: {
-                            "fragment_size": self.defaults.get('fragment_size', 150),
-                            "number_of_fragments": self.defaults.get('number_of_fragments', 3)
+                            "fragment_size": self._default_fragment_size,
+                            "number_of_fragments": self._default_number_of_fragments
                         } for field in fields
                     }
                 }
@@ -147,44 +177,50 @@ class LexicalSearch:
             self.logger.error(f"Error en búsqueda léxica: {str(e)}")
             raise
     
-    def _format_results(self, response: Dict, query: str) -> Dict[str, Any]:
-        """Formatea los resultados de OpenSearch en formato compatible con tool_executor"""
+    def _format_results(self, response: Dict, query: str,
+                        include_preview: bool = False) -> Dict[str, Any]:
+        """
+        Formatea los resultados de OpenSearch en formato compatible con tool_executor.
+        
+        Devuelve la misma forma que semantic_search (``total_found`` y
+        ``fragments``); ``content_preview`` solo se calcula si se solicita.
+        """
         fragments = []
         
         for hit in response['hits']['hits']:
             source = hit['_source']
-            highlights = hit.get('highlight', {})
-            
-            # Procesar highlights
-            matches = []
-            for field, highlight_list in highlights.items():
-                for highlight in highlight_list:
-                    matches.append({
-                        "field": field,
-                        "snippet": highlight
-                    })
+            content = source.get('content')
             
             # Formato compatible con semantic_search (usa 'fragments' y 'content')
-            fragments.append({
+            fragment = {
                 "file_name": source['file_name'],
                 "score": hit['_score'],
                 "chunk_id": source.get('chunk_id', 'unknown'),
-                "matches": matches,
-                "metadata": source.get('metadata', {}),
-                "content": source['content'],  # Contenido completo, no preview
-                "content_preview": source['content'][:300] + "..." if len(source['content']) > 300 else source['content']
-            })
+                "matches": [
+                    {"field": field, "snippet": snippet}
+                    for field, snippets in hit.get('highlight', {}).items()
+                    for snippet in snippets
+                ],
+                "metadata": source.get('metadata', {})
+            }
+            if content is not None:
+                fragment["content"] = content  # Contenido completo, no preview
+                if include_preview:
+                    fragment["content_preview"] = _preview(content)
+            fragments.append(fragment)
         
         return {
             "query": query,
             "total_found": len(fragments),  # Compatible con semantic_search
-            "total_results": len(fragments),  # Mantener para compatibilidad
             "fragments": fragments,  # Formato esperado por tool_executor
-            "results": fragments,  # Mantener para compatibilidad con CLI
             "query_terms": query.split(),
             "search_type": "lexical"
         }
 
+def _preview(content: str, length: int = 300) -> str:
+    """Devuelve el inicio del contenido, truncado a ``length`` caracteres"""
+    return content[:length] + "..." if len(content) > length else content
+
 def main():
     """Función principal para uso desde línea de comandos"""
     parser = argparse.ArgumentParser(
@@ -199,7 +235,7 @@ def main():
     parser.add_argument(
         "--fields",
         nargs="+",
-        choices=["content", "file_name", "metadata.summary"],
+        choices=sorted(_VALID_FIELDS),
         help="Campos donde buscar"
     )
     
@@ -221,6 +257,12 @@ def main():
         help="Permitir coincidencias aproximadas"
     )
     
+    parser.add_argument(
+        "--no-content",
+        action="store_true",
+        help="No descargar el contenido completo de los chunks (solo highlights)"
+    )
+    
     parser.add_argument(
         "--config",
         default="config/config.yaml",
@@ -246,7 +288,8 @@ def main():
             fields=args.fields,
             operator=args.operator,
             top_k=args.top_k,
-            fuzzy=args.fuzzy
+            fuzzy=args.fuzzy,
+            include_content=not args.no_content
         )
         
         # Mostrar resultados
@@ -267,10 +310,10 @@ def print_pretty_results(result: Dict[str, Any]):
     
     print(f"🔍 Búsqueda léxica: '{result['query']}'")
     print(f"🏷️  Términos: {', '.join(result['query_terms'])}")
-    print(f"📊 Resultados encontrados: {result['total_results']}")
+    print(f"📊 Resultados encontrados: {result['total_found']}")
     print("=" * 80)
     
-    for i, item in enumerate(result['results'], 1):
+    for i, item in enumerate(result['fragments'], 1):
         print(f"\n{i}. 📄 {item['file_name']}")
         print(f"   🎯 Score: {item['score']:.3f}")
         print(f"   🔗 Chunk ID: {item['chunk_id']}")
@@ -284,7 +327,8 @@ def print_pretty_results(result: Dict[str, Any]):
                 print(f"      • {field}: {snippet}")
         
         # Mostrar preview del contenido
-        print(f"   📝 Vista previa: {item['content_preview']}")
+        if 'content' in item:
+            print(f"   📝 Vista previa: {item.get('content_preview') or _preview(item['content'])}")
         
         # Mostrar metadatos si están disponibles
         metadata = item.get('metadata', {})
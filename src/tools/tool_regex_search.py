@@ -5,17 +5,228 @@ Búsqueda mediante patrones regex para encontrar estructuras específicas de có
 """
 
 import argparse
-import json
+import bisect
+import functools
+import itertools
+import logging
+import os
 import sys
 import re
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import re2  # google-re2: motor de tiempo lineal, sin backtracking
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+try:
+    import regex  # Compatible con re y admite timeout por búsqueda
+    REGEX_AVAILABLE = True
+except ImportError:
+    REGEX_AVAILABLE = False
 
 from common.common import (
     Config, OpenSearchClient, Logger,
     handle_search_error, log_search_metrics, validate_parameters,
-    get_cache, ValidationError
+    get_cache, make_cache_key, print_json, ValidationError
 )
 
+# Separador de líneas, para indexar los offsets de cada salto
+_NEWLINE_RE = re.compile('\n')
+
+# Patrón sin metacaracteres: solo letras o dígitos (Unicode, como str.isalnum)
+# y espacios; [^\W_] es \w sin el guion bajo
+_SIMPLE_PATTERN_RE = re.compile(r'(?:[^\W_]|\s)*')
+
+# Caracteres de contenido ASCII que \s trata distinto según el motor: re sobre
+# str los considera espacio (\x1c-\x1f), re sobre bytes no, y re2 tampoco \v
+_ENGINE_DEPENDENT_SPACE_RE = re.compile('[\x0b\x1c-\x1f]')
+
+# A partir de este tamaño los saltos de línea se localizan con numpy
+_NUMPY_NEWLINES_MIN_CHARS = 1024
+
+# Hilos para escanear los chunks en paralelo cuando el motor es re2
+_SCAN_WORKERS = min(8, os.cpu_count() or 1)
+
+class PatternType(Enum):
+    """Tipo de patrón, según el que se elige la query de OpenSearch"""
+    LITERAL_TOKEN = "literal_token"    # Palabra sin metacaracteres
+    LITERAL_PHRASE = "literal_phrase"  # Varias palabras sin metacaracteres
+    REGEXP = "regexp"                  # Expresión regular
+
+def _classify_pattern(pattern: str) -> PatternType:
+    """Clasifica el patrón para construir la query de candidatos"""
+    if not _SIMPLE_PATTERN_RE.fullmatch(pattern):
+        return PatternType.REGEXP
+    if len(pattern.split()) > 1:
+        return PatternType.LITERAL_PHRASE
+    return PatternType.LITERAL_TOKEN
+
+def _normalize_file_types(file_types: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Normaliza las extensiones al formato indexado en metadata.file_extension
+    (minúsculas y con punto: "PY", "py" y ".py" son ".py"), sin duplicados y
+    ordenadas, para que el filtro y la clave de cache no dependan del orden
+    """
+    if not file_types:
+        return None
+    return sorted({'.' + file_type.strip().lower().lstrip('.') for file_type in file_types})
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int) -> 're.Pattern':
+    """Compila un patrón, reutilizando el objeto compilado entre búsquedas"""
+    return re.compile(pattern, flags)
+
+@functools.lru_cache(maxsize=256)
+def _required_literal(pattern: str, flags: int) -> Optional[str]:
+    """
+    Devuelve el literal más largo que toda coincidencia del patrón debe
+    contener (p. ej. "def" en ``def\\s+foo``), o None si no hay ninguno
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return None
+    
+    # Un (?i) en línea cambia la sensibilidad a mayúsculas respecto a flags
+    if (parsed.state.flags ^ flags) & re.IGNORECASE:
+        return None
+    
+    best, run = '', []
+    items = list(parsed)
+    while items:
+        op, av = items.pop(0)
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            # Grupo sin flags propios: su contenido sigue siendo obligatorio
+            items[:0] = list(av[3])
+            continue
+        # Cualquier otro nodo (clases, repeticiones, alternativas, anclas)
+        # corta la secuencia de literales contiguos
+        if len(run) > len(best):
+            best = ''.join(run)
+        run = []
+    if len(run) > len(best):
+        best = ''.join(run)
+    
+    return best or None
+
+# Flags de re que se trasladan a re2 como flags en línea
+_RE2_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+@functools.lru_cache(maxsize=256)
+def _compile_re2(pattern: str, flags: int):
+    """
+    Compila el patrón con re2, o devuelve None si re2 no está disponible o no
+    admite el patrón (referencias hacia atrás, lookaround...)
+    """
+    if not RE2_AVAILABLE:
+        return None
+    
+    inline = ''.join(letter for flag, letter in _RE2_INLINE_FLAGS if flags & flag)
+    try:
+        return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+    except re2.error as e:
+        logging.getLogger(__name__).debug(f"re2 no admite el patrón, se usa re: {e}")
+        return None
+
+@functools.lru_cache(maxsize=256)
+def _compile_guarded(pattern: str, flags: int):
+    """
+    Compila el patrón con el módulo regex, cuyas búsquedas admiten timeout, o
+    devuelve None si no está disponible
+    """
+    if not REGEX_AVAILABLE:
+        return None
+    
+    try:
+        return regex.compile(pattern, flags)
+    except regex.error as e:
+        logging.getLogger(__name__).debug(f"regex no admite el patrón, se usa re: {e}")
+        return None
+
+@functools.lru_cache(maxsize=256)
+def _compile_bytes(pattern: str, flags: int, guarded: bool):
+    """
+    Compila la versión bytes de un patrón ASCII (con el módulo regex si
+    ``guarded``, para conservar el timeout), o devuelve None si el patrón no
+    es ASCII o no es válido sobre bytes
+    """
+    if not pattern.isascii():
+        return None
+    
+    pattern_bytes = pattern.encode('ascii')
+    try:
+        if guarded:
+            return regex.compile(pattern_bytes, flags)
+        return re.compile(pattern_bytes, flags)
+    except (re.error, *((regex.error,) if REGEX_AVAILABLE else ())) as e:
+        logging.getLogger(__name__).debug(f"El patrón no admite búsqueda sobre bytes: {e}")
+        return None
+
+def _is_plain_ascii(content: str) -> bool:
+    """
+    Indica si el contenido es ASCII sin los caracteres en que difiere \s
+    entre motores: en él re2 y re sobre bytes dan los mismos matches que re
+    """
+    return content.isascii() and not _ENGINE_DEPENDENT_SPACE_RE.search(content)
+
+def _newline_offsets(content: str) -> List[int]:
+    """
+    Offsets (en caracteres) de los saltos de línea del contenido.
+    
+    Con numpy se comparan en bloque los códigos del texto: los bytes si es
+    ASCII o las unidades UTF-32, que corresponden una a una con los
+    caracteres de un str, así que los offsets son exactos en ambos casos.
+    """
+    if not NUMPY_AVAILABLE or len(content) < _NUMPY_NEWLINES_MIN_CHARS:
+        return [m.start() for m in _NEWLINE_RE.finditer(content)]
+    
+    if content.isascii():
+        codes = np.frombuffer(content.encode('ascii'), dtype=np.uint8)
+    else:
+        codes = np.frombuffer(content.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    return np.flatnonzero(codes == 10).tolist()
+
+def _fallback_match(content: str, pattern: str) -> Dict[str, Any]:
+    """Match genérico para un chunk que OpenSearch encontró pero que Python no puede procesar"""
+    return {
+        "line_number": 1,
+        "match": f"Contenido encontrado por OpenSearch (patrón: {pattern})",
+        "match_start": 0,
+        "match_end": len(content),
+        "context_before": [],
+        "context_after": [],
+        "full_line": content[:500] + "..." if len(content) > 500 else content
+    }
+
+def _finditer_re2(pattern, content: str):
+    """finditer de re2 sin los matches vacíos que repite en la misma posición"""
+    last_span = None
+    for match in pattern.finditer(content):
+        span = (match.start(), match.end())
+        if span != last_span:
+            yield match
+        last_span = span
+
 class RegexSearch:
     """Clase principal para búsqueda por regex"""
     
@@ -53,49 +264,67 @@ class RegexSearch:
             Dict con resultados de la búsqueda
         """
         # Aplicar valores por defecto
+        file_types = _normalize_file_types(file_types)
         case_sensitive = case_sensitive if case_sensitive is not None else self.defaults.get('case_sensitive', True)
         max_matches_per_file = max_matches_per_file or self.defaults.get('max_matches_per_file', 50)
-        context_lines = context_lines or self.defaults.get('context_lines', 2)
+        context_lines = context_lines if context_lines is not None else self.defaults.get('context_lines', 2)
         
         # Validar parámetros
         if not isinstance(pattern, str) or len(pattern.strip()) == 0:
             raise ValidationError("Pattern debe ser una cadena no vacía")
         
-        # Validar que el patrón regex es válido
-        flags = 0 if case_sensitive else re.IGNORECASE
-        try:
-            re.compile(pattern, flags)
-        except re.error as e:
-            raise ValidationError(f"Patrón regex inválido: {str(e)}")
-        
         if max_matches_per_file <= 0 or max_matches_per_file > 1000:
             raise ValidationError("max_matches_per_file debe estar entre 1 y 1000")
         
         if context_lines < 0 or context_lines > 20:
             raise ValidationError("context_lines debe estar entre 0 y 20")
         
-        # Verificar cache
-        cache_key = f"regex:{hash(pattern)}:{str(file_types)}:{case_sensitive}:{max_matches_per_file}:{context_lines}"
+        # Verificar cache (clave estable entre procesos). Solo se cachean
+        # búsquedas con patrones válidos, así que un acierto no se revalida
+        cache_key = make_cache_key("regex", pattern, file_types, case_sensitive,
+                                   max_matches_per_file, context_lines)
         if self.cache:
             cached_result = self.cache.get(cache_key)
             if cached_result:
                 self.logger.info(f"Resultado obtenido del cache para pattern: {pattern[:50]}...")
                 return cached_result
         
+        # Validar que el patrón regex es válido
+        flags = 0 if case_sensitive else re.IGNORECASE
+        try:
+            _compile(pattern, flags)
+        except re.error as e:
+            raise ValidationError(f"Patrón regex inválido: {str(e)}")
+        
         try:
             # 1. Construir query de búsqueda
-            # Para patrones simples sin caracteres especiales de regex, usar wildcard
+            # Para frases literales, match_phrase (resuelto con el índice invertido)
+            # Para palabras sin caracteres especiales de regex, usar wildcard
             # Para patrones complejos, usar regexp
-            is_simple_pattern = all(c.isalnum() or c.isspace() for c in pattern)
+            pattern_type = _classify_pattern(pattern)
             
-            if is_simple_pattern:
-                # Usar wildcard query para patrones simples (más eficiente y confiable)
+            if pattern_type is PatternType.LITERAL_PHRASE:
+                # Un wildcard se evalúa término a término y nunca casa con un
+                # espacio; la frase se busca por posiciones en el campo analizado
+                search_body = {
+                    "query": {
+                        "match_phrase": {
+                            "content": {
+                                "query": pattern,
+                                "slop": 0
+                            }
+                        }
+                    },
+                    "_source": ["content", "file_name", "metadata", "chunk_id"]
+                }
+            elif pattern_type is PatternType.LITERAL_TOKEN:
+                # Usar wildcard query para palabras sueltas: encuentra también el
+                # patrón dentro de términos más largos (p. ej. "Config" en "AppConfig")
                 search_body = {
-                    "size": self.defaults.get('max_documents', 1000),
                     "query": {
                         "wildcard": {
                             "content": {
-                                "value": f"*{pattern}*",
+                                "value": f"*{pattern.strip()}*",
                                 "case_insensitive": not case_sensitive
                             }
                         }
@@ -105,7 +334,6 @@ class RegexSearch:
             else:
                 # Usar regexp query para patrones complejos
                 search_body = {
-                    "size": self.defaults.get('max_documents', 1000),
                     "query": {
                         "regexp": {
                             "content": {
@@ -128,20 +356,16 @@ class RegexSearch:
                     }
                 }
             
-            # 3. Ejecutar búsqueda
+            # 3. Ejecutar búsqueda y 4. procesar matches con contexto a medida
+            #    que llegan las páginas de hits
             self.logger.debug(f"Ejecutando búsqueda regex en índice: {self.index_name}")
-            response = self.opensearch_client.search(
-                index=self.index_name,
-                body=search_body
-            )
-            
-            # 4. Procesar matches con contexto
             result = self._format_regex_results(
-                response, pattern, context_lines, max_matches_per_file, flags
+                self._iter_hits(search_body), pattern, context_lines, max_matches_per_file, flags
             )
             
-            # 5. Guardar en cache
-            if self.cache:
+            # 5. Guardar en cache (un resultado truncado por presupuesto
+            #    depende de la carga del momento y no se reutiliza)
+            if self.cache and not result['truncated']:
                 self.cache.set(cache_key, result)
             
             return result
@@ -150,91 +374,104 @@ class RegexSearch:
             self.logger.error(f"Error en búsqueda regex: {str(e)}")
             raise
     
-    def _format_regex_results(self, response: Dict, pattern: str, context_lines: int,
+    def _iter_hits(self, search_body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los hits de la búsqueda con scroll, página a página, hasta
+        agotarlos o alcanzar max_documents
+        """
+        max_documents = self.defaults.get('max_documents', 1000)
+        scroll_timeout = self.config.get('opensearch.scroll_timeout', '2m')
+        
+        # Las queries wildcard/regexp puntúan igual todos los documentos:
+        # ordenar por _doc es el recorrido más barato para el scroll
+        body = dict(search_body,
+                    size=min(self.defaults.get('batch_size', 500), max_documents),
+                    sort=["_doc"])
+        
+        response = self.opensearch_client.search(
+            index=self.index_name,
+            body=body,
+            scroll=scroll_timeout
+        )
+        scroll_id = response.get('_scroll_id')
+        remaining = max_documents
+        
+        try:
+            while response['hits']['hits']:
+                hits = response['hits']['hits'][:remaining]
+                yield from hits
+                remaining -= len(hits)
+                
+                if remaining <= 0 or not scroll_id:
+                    break
+                
+                response = self.opensearch_client.scroll(
+                    scroll_id=scroll_id,
+                    scroll=scroll_timeout
+                )
+                scroll_id = response.get('_scroll_id', scroll_id)
+        finally:
+            if scroll_id:
+                try:
+                    self.opensearch_client.clear_scroll(scroll_id=scroll_id)
+                except Exception as e:
+                    self.logger.debug(f"No se pudo liberar el scroll: {e}")
+    
+    def _format_regex_results(self, hits: Iterable[Dict[str, Any]], pattern: str, context_lines: int,
                              max_matches_per_file: int, flags: int) -> Dict[str, Any]:
         """Formatea los resultados de la búsqueda regex"""
-        results = []
-        total_matches = 0
-        
         # Intentar compilar el patrón, pero si falla, mostrar los resultados de OpenSearch sin procesamiento adicional
         try:
-            compiled_pattern = re.compile(pattern, flags)
-            use_python_regex = True
+            # Un único recorrido por chunk: MULTILINE mantiene ^ y $ por línea
+            compiled_pattern = _compile(pattern, flags | re.MULTILINE)
+            re2_pattern = _compile_re2(pattern, flags | re.MULTILINE)
+            guarded_pattern = _compile_guarded(pattern, flags | re.MULTILINE)
+            bytes_pattern = _compile_bytes(pattern, flags | re.MULTILINE, guarded_pattern is not None)
+            needle = _required_literal(pattern, flags)
         except re.error:
-            use_python_regex = False
+            compiled_pattern = re2_pattern = guarded_pattern = bytes_pattern = needle = None
             self.logger.warning(f"No se pudo compilar el patrón regex en Python: {pattern}")
+        self.logger.debug(f"Cache de patrones compilados: {_compile.cache_info()}")
         
-        for hit in response['hits']['hits']:
-            source = hit['_source']
-            content = source['content']
-            lines = content.split('\n')
-            
-            # Buscar matches en el contenido
-            matches = []
-            
-            if use_python_regex:
-                # Usar regex de Python para encontrar matches exactos
-                for line_num, line in enumerate(lines):
-                    for match in compiled_pattern.finditer(line):
-                        if len(matches) >= max_matches_per_file:
-                            break
-                        
-                        # Extraer contexto
-                        start_line = max(0, line_num - context_lines)
-                        end_line = min(len(lines), line_num + context_lines + 1)
-                        
-                        context_before = lines[start_line:line_num]
-                        context_after = lines[line_num + 1:end_line]
-                        
-                        matches.append({
-                            "line_number": line_num + 1,
-                            "match": match.group(),
-                            "match_start": match.start(),
-                            "match_end": match.end(),
-                            "context_before": context_before,
-                            "context_after": context_after,
-                            "full_line": line
-                        })
-                        total_matches += 1
-                    
-                    if len(matches) >= max_matches_per_file:
-                        break
-            else:
-                # Si no se puede usar regex de Python, mostrar el contenido completo que OpenSearch encontró
-                # Esto es útil cuando OpenSearch encuentra resultados pero Python no puede procesar el patrón
-                matches.append({
-                    "line_number": 1,
-                    "match": f"Contenido encontrado por OpenSearch (patrón: {pattern})",
-                    "match_start": 0,
-                    "match_end": len(content),
-                    "context_before": [],
-                    "context_after": [],
-                    "full_line": content[:500] + "..." if len(content) > 500 else content
-                })
-                total_matches += 1
-            
-            # Solo agregar si hay matches o si OpenSearch encontró el documento
-            if matches or not use_python_regex:
-                if not matches and not use_python_regex:
-                    # Crear un match genérico para mostrar que OpenSearch encontró algo
-                    matches.append({
-                        "line_number": 1,
-                        "match": f"Contenido encontrado por OpenSearch",
-                        "match_start": 0,
-                        "match_end": 0,
-                        "context_before": [],
-                        "context_after": [],
-                        "full_line": content[:200] + "..." if len(content) > 200 else content
-                    })
-                    total_matches += 1
-                
-                results.append({
-                    "file_name": source['file_name'],
-                    "chunk_id": source.get('chunk_id', 'unknown'),
-                    "matches": matches,
-                    "match_count": len(matches),
-                    "metadata": source.get('metadata', {})
-                })
+        process_hit = functools.partial(
+            self._process_hit, pattern=pattern, compiled_pattern=compiled_pattern,
+            re2_pattern=re2_pattern, guarded_pattern=guarded_pattern, bytes_pattern=bytes_pattern,
+            needle=needle, flags=flags,
+            context_lines=context_lines, max_matches_per_file=max_matches_per_file,
+            timeout=self.defaults.get('regex_timeout_s', 0.5)
+        )
+        
+        # Presupuesto de toda la búsqueda: acota el peor caso cuando muchos
+        # chunks grandes se combinan con un patrón costoso. Solo cuenta el
+        # escaneo regex, no la espera de las páginas de OpenSearch
+        budget = {"truncated": False, "scan_time": 0.0}
+        budget_lock = threading.Lock()
+        
+        def scan_hit(hit: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            start = time.monotonic()
+            try:
+                return process_hit(hit)
+            finally:
+                elapsed = time.monotonic() - start
+                with budget_lock:
+                    budget["scan_time"] += elapsed
+        
+        hits = self._within_budget(
+            hits, budget,
+            char_budget=self.defaults.get('char_budget', 50_000_000),
+            time_budget_s=self.defaults.get('time_budget_s', 2.0)
+        )
+        
+        if re2_pattern is not None and _SCAN_WORKERS > 1:
+            # re2 libera el GIL mientras busca: los chunks se escanean en paralelo.
+            # executor.map consume los hits por adelantado, así que aquí el
+            # presupuesto de caracteres es el que acota el escaneo (re2 es lineal)
+            with ThreadPoolExecutor(max_workers=_SCAN_WORKERS) as executor:
+                results = [result for result in executor.map(scan_hit, hits) if result]
+        else:
+            results = [result for result in map(scan_hit, hits) if result]
+        
+        total_matches = sum(result['match_count'] for result in results)
         
         return {
             "pattern": pattern,
@@ -243,8 +480,164 @@ class RegexSearch:
             "total_found": len(results),  # Compatible con otras herramientas
             "results": results,  # Mantener para CLI
             "fragments": results,  # Compatible con request_handler
+            "truncated": budget["truncated"],
             "search_type": "regex"
         }
+    
+    def _within_budget(self, hits: Iterable[Dict[str, Any]], budget: Dict[str, Any],
+                       char_budget: int, time_budget_s: float) -> Iterator[Dict[str, Any]]:
+        """
+        Entrega los hits mientras no se agoten los caracteres ni el tiempo de
+        escaneo (``budget['scan_time']``, acumulado por quien procesa los
+        hits); al agotarse marca ``budget['truncated']`` y deja de consumir
+        """
+        scanned = 0
+        
+        for hit in hits:
+            if scanned >= char_budget or budget["scan_time"] >= time_budget_s:
+                budget["truncated"] = True
+                self.logger.warning(
+                    f"Búsqueda regex truncada por presupuesto: {scanned} caracteres "
+                    f"escaneados en {budget['scan_time']:.2f}s"
+                )
+                return
+            
+            scanned += len(hit['_source']['content'])
+            yield hit
+    
+    def _process_hit(self, hit: Dict[str, Any], pattern: str, compiled_pattern: Optional['re.Pattern'],
+                     re2_pattern, guarded_pattern, bytes_pattern, needle: Optional[str],
+                     flags: int, context_lines: int, max_matches_per_file: int,
+                     timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Busca el patrón en un hit de OpenSearch.
+        
+        Returns:
+            Dict con los matches del chunk, o None si no tiene ninguno
+        """
+        source = hit['_source']
+        content = source['content']
+        
+        if compiled_pattern is None:
+            # Si no se puede usar regex de Python, mostrar el contenido que OpenSearch encontró
+            # Esto es útil cuando OpenSearch encuentra resultados pero Python no puede procesar el patrón
+            matches = [_fallback_match(content, pattern)]
+        else:
+            matches = self._find_matches(content, pattern, compiled_pattern, re2_pattern,
+                                         guarded_pattern, bytes_pattern, needle, flags,
+                                         context_lines, max_matches_per_file, timeout)
+        
+        # Solo agregar los chunks con matches
+        if not matches:
+            return None
+        
+        return {
+            "file_name": source['file_name'],
+            "chunk_id": source.get('chunk_id', 'unknown'),
+            "matches": matches,
+            "match_count": len(matches),
+            "metadata": source.get('metadata', {})
+        }
+    
+    def _find_matches(self, content: str, pattern: str, compiled_pattern: 're.Pattern',
+                      re2_pattern, guarded_pattern, bytes_pattern, needle: Optional[str],
+                      flags: int, context_lines: int, max_matches_per_file: int,
+                      timeout: float) -> List[Dict[str, Any]]:
+        """Busca los matches del patrón en el contenido de un chunk"""
+        matches = []
+        
+        # Descartar los chunks que no contienen el literal obligatorio del
+        # patrón antes de lanzar la búsqueda completa. Sin distinguir
+        # mayúsculas, el literal se busca con el mismo IGNORECASE que el
+        # patrón (sin copiar el contenido en minúsculas)
+        if needle is not None:
+            if not flags & re.IGNORECASE:
+                if needle not in content:
+                    return matches
+            elif not _compile(re.escape(needle), flags).search(content):
+                return matches
+        
+        # Usar regex de Python para encontrar matches exactos, recorriendo el
+        # chunk completo y localizando la línea de cada match por bisección.
+        # Los offsets de línea y el troceado en líneas (solo necesario para
+        # el contexto) se calculan al encontrar el primer match.
+        newline_offsets = None
+        lines = None
+        
+        # re2 y los patrones sobre bytes solo se usan con contenido ASCII, donde
+        # \w, \b, \d, \s y la comparación sin mayúsculas coinciden con las de re
+        # sobre str; en el resto se usa el módulo regex, que acota el
+        # backtracking con un timeout, o re si no está instalado
+        plain_ascii = _is_plain_ascii(content)
+        as_bytes = False
+        if re2_pattern is not None and plain_ascii:
+            found = _finditer_re2(re2_pattern, content)
+        elif bytes_pattern is not None and plain_ascii:
+            # Los offsets en bytes coinciden con los de caracteres
+            data = content.encode('ascii')
+            if guarded_pattern is not None:
+                found = bytes_pattern.finditer(data, timeout=timeout)
+            else:
+                found = bytes_pattern.finditer(data)
+            as_bytes = True
+        elif guarded_pattern is not None:
+            found = guarded_pattern.finditer(content, timeout=timeout)
+        else:
+            found = compiled_pattern.finditer(content)
+        
+        try:
+            # islice corta el recorrido del motor al alcanzar el máximo por archivo
+            for match in itertools.islice(found, max_matches_per_file):
+                if newline_offsets is None:
+                    newline_offsets = _newline_offsets(content)
+                
+                line_num = bisect.bisect_left(newline_offsets, match.start())
+                # Un patrón que consume saltos de línea (p. ej. foo\s+bar) puede
+                # terminar en una línea posterior: full_line abarca todas las
+                # líneas del match, sin contar el salto final que consuma
+                last_num = bisect.bisect_left(newline_offsets, max(match.start(), match.end() - 1))
+                line_start = newline_offsets[line_num - 1] + 1 if line_num else 0
+                line_end = newline_offsets[last_num] if last_num < len(newline_offsets) else len(content)
+                
+                # Extraer contexto
+                if context_lines:
+                    if lines is None:
+                        lines = content.split('\n')
+                    
+                    start_line = max(0, line_num - context_lines)
+                    end_line = min(len(lines), last_num + context_lines + 1)
+                    
+                    context_before = lines[start_line:line_num]
+                    context_after = lines[last_num + 1:end_line]
+                else:
+                    context_before = []
+                    context_after = []
+                
+                # Las posiciones se siguen dando relativas al inicio de full_line
+                matches.append({
+                    "line_number": line_num + 1,
+                    "match": match.group().decode('ascii') if as_bytes else match.group(),
+                    "match_start": match.start() - line_start,
+                    "match_end": match.end() - line_start,
+                    "context_before": context_before,
+                    "context_after": context_after,
+                    "full_line": content[line_start:line_end]
+                })
+        except TimeoutError:
+            # Patrón con backtracking catastrófico: se corta la búsqueda en
+            # este chunk y se deja constancia en lugar de propagar el error
+            self.logger.warning(f"Tiempo agotado ({timeout}s) buscando el patrón: {pattern[:50]}")
+            matches.append({
+                "line_number": 1,
+                "match": f"Tiempo de búsqueda agotado (patrón: {pattern})",
+                "match_start": 0,
+                "match_end": 0,
+                "context_before": [],
+                "context_after": [],
+                "full_line": ""
+            })
+        
+        return matches
 
 def main():
     """Función principal para uso desde línea de comandos"""
@@ -311,7 +704,7 @@ def main():
         
         # Mostrar resultados
         if args.output == "json":
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print_json(result)
         else:
             print_pretty_results(result)
             
@@ -327,6 +720,8 @@ def print_pretty_results(result: Dict[str, Any]):
     
     print(f"🔍 Búsqueda regex: '{result['pattern']}'")
     print(f"📊 Total coincidencias: {result['total_matches']} en {result['total_files']} archivos")
+    if result.get('truncated'):
+        print("⚠️  Resultados parciales: se agotó el presupuesto de la búsqueda")
     print("=" * 80)
     
     for i, file_result in enumerate(result['results'], 1):
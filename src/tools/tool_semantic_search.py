@@ -5,8 +5,8 @@ Busca contenido por significado conceptual, no solo por palabras exactas.
 """
 
 import argparse
-import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 
 # Suprimir warnings de urllib3 sobre HTTPS no verificado
@@ -18,7 +18,7 @@ warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 from common.common import (
     Config, OpenSearchClient, BedrockClient, Logger,
     handle_search_error, log_search_metrics, validate_parameters,
-    get_cache, ValidationError
+    get_cache, make_cache_key, print_json, ValidationError
 )
 
 class SemanticSearch:
@@ -56,22 +56,14 @@ class SemanticSearch:
         Returns:
             Dict con resultados de la búsqueda
         """
-        # Aplicar valores por defecto
-        top_k = top_k or self.defaults.get('top_k', 10)
-        min_score = min_score or self.defaults.get('min_score', 0.5)
+        top_k, min_score = self._resolve_params(top_k, min_score)
         
         # Validar parámetros
         if not isinstance(query, str) or len(query.strip()) == 0:
             raise ValidationError("Query debe ser una cadena no vacía")
         
-        if not 0 <= min_score <= 1:
-            raise ValidationError("min_score debe estar entre 0.0 y 1.0")
-        
-        if top_k <= 0 or top_k > self.defaults.get('max_results', 1000):
-            raise ValidationError(f"top_k debe estar entre 1 y {self.defaults.get('max_results', 1000)}")
-        
         # Verificar cache
-        cache_key = f"semantic:{hash(query)}:{top_k}:{min_score}:{str(file_types)}"
+        cache_key = self._cache_key(query, top_k, min_score, file_types)
         if self.cache:
             cached_result = self.cache.get(cache_key)
             if cached_result:
@@ -83,43 +75,20 @@ class SemanticSearch:
             self.logger.debug(f"Generando embedding para query: {query[:100]}...")
             query_embedding = self.bedrock_client.generate_embedding(query)
             
-            # 2. Construir query de búsqueda KNN
-            search_body = {
-                "size": top_k,
-                "query": {
-                    "knn": {
-                        "embedding": {
-                            "vector": query_embedding,
-                            "k": top_k
-                        }
-                    }
-                },
-                "_source": ["content", "file_name", "metadata", "chunk_id"],
-                "min_score": min_score
-            }
-            
-            # 3. Filtrar por tipos de archivo si se especifica
-            if file_types:
-                search_body["query"] = {
-                    "bool": {
-                        "must": [search_body["query"]],
-                        "filter": {
-                            "terms": {"metadata.file_extension": file_types}
-                        }
-                    }
-                }
+            # 2. Construir query de búsqueda KNN (filtrada por tipos de archivo si se especifica)
+            search_body = self._build_search_body(query_embedding, top_k, min_score, file_types)
             
-            # 4. Ejecutar búsqueda
+            # 3. Ejecutar búsqueda
             self.logger.debug(f"Ejecutando búsqueda KNN en índice: {self.index_name}")
             response = self.opensearch_client.search(
                 index=self.index_name, 
                 body=search_body
             )
             
-            # 5. Formatear resultados
+            # 4. Formatear resultados
             result = self._format_results(response, query)
             
-            # 6. Guardar en cache
+            # 5. Guardar en cache
             if self.cache:
                 self.cache.set(cache_key, result)
             
@@ -129,6 +98,141 @@ class SemanticSearch:
             self.logger.error(f"Error en búsqueda semántica: {str(e)}")
             raise
     
+    @handle_search_error
+    @log_search_metrics
+    @validate_parameters(['queries'])
+    def search_many(self, queries: List[str], top_k: Optional[int] = None,
+                    min_score: Optional[float] = None,
+                    file_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Realiza varias búsquedas semánticas en lote.
+        
+        Las queries duplicadas se resuelven una sola vez, los embeddings que no
+        están en cache se generan en paralelo contra Bedrock y todas las
+        búsquedas KNN se envían a OpenSearch en un único ``msearch``.
+        
+        Args:
+            queries: Lista de descripciones conceptuales a buscar
+            top_k: Número de resultados más relevantes por query
+            min_score: Puntuación mínima de similitud (0.0-1.0)
+            file_types: Filtrar por tipos de archivo
+            
+        Returns:
+            Dict con un resultado por query, en el mismo orden de entrada
+        """
+        top_k, min_score = self._resolve_params(top_k, min_score)
+        
+        if not isinstance(queries, list) or not queries:
+            raise ValidationError("queries debe ser una lista no vacía")
+        
+        for query in queries:
+            if not isinstance(query, str) or len(query.strip()) == 0:
+                raise ValidationError("Cada query debe ser una cadena no vacía")
+        
+        # 1. Deduplicar queries manteniendo el orden
+        unique_queries = list(dict.fromkeys(queries))
+        results_by_query = {}
+        
+        # 2. Resolver desde cache las queries ya buscadas
+        pending = []
+        for query in unique_queries:
+            cached_result = self.cache.get(self._cache_key(query, top_k, min_score, file_types)) if self.cache else None
+            if cached_result:
+                results_by_query[query] = cached_result
+            else:
+                pending.append(query)
+        
+        if pending:
+            try:
+                # 3. Generar embeddings en paralelo
+                self.logger.debug(f"Generando {len(pending)} embeddings en paralelo...")
+                with ThreadPoolExecutor(max_workers=min(8, len(pending))) as executor:
+                    embeddings = list(executor.map(self.bedrock_client.generate_embedding, pending))
+                
+                # 4. Una sola petición msearch con todas las búsquedas KNN
+                msearch_body = []
+                for embedding in embeddings:
+                    msearch_body.append({"index": self.index_name})
+                    msearch_body.append(self._build_search_body(embedding, top_k, min_score, file_types))
+                
+                self.logger.debug(f"Ejecutando msearch con {len(pending)} búsquedas KNN en índice: {self.index_name}")
+                response = self.opensearch_client.msearch(body=msearch_body)
+                
+                # 5. Formatear resultados y guardar en cache
+                for query, query_response in zip(pending, response['responses']):
+                    if 'error' in query_response:
+                        results_by_query[query] = {
+                            "error": f"OpenSearch error: {query_response['error']}",
+                            "type": "opensearch"
+                        }
+                        continue
+                    
+                    result = self._format_results(query_response, query)
+                    results_by_query[query] = result
+                    if self.cache:
+                        self.cache.set(self._cache_key(query, top_k, min_score, file_types), result)
+                
+            except Exception as e:
+                self.logger.error(f"Error en búsqueda semántica en lote: {str(e)}")
+                raise
+        
+        results = [results_by_query[query] for query in queries]
+        
+        return {
+            "queries": queries,
+            "total_found": sum(result.get('total_found', 0) for result in results),
+            "results": results,
+            "search_type": "semantic_batch"
+        }
+    
+    def _resolve_params(self, top_k: Optional[int], min_score: Optional[float]):
+        """Aplica valores por defecto y valida top_k y min_score"""
+        top_k = top_k or self.defaults.get('top_k', 10)
+        min_score = min_score or self.defaults.get('min_score', 0.5)
+        
+        if not 0 <= min_score <= 1:
+            raise ValidationError("min_score debe estar entre 0.0 y 1.0")
+        
+        if top_k <= 0 or top_k > self.defaults.get('max_results', 1000):
+            raise ValidationError(f"top_k debe estar entre 1 y {self.defaults.get('max_results', 1000)}")
+        
+        return top_k, min_score
+    
+    def _cache_key(self, query: str, top_k: int, min_score: float,
+                   file_types: Optional[List[str]]) -> str:
+        """Construye la clave de cache de una búsqueda"""
+        return make_cache_key("semantic", query, top_k, min_score, file_types)
+    
+    def _build_search_body(self, query_embedding: List[float], top_k: int,
+                           min_score: float, file_types: Optional[List[str]]) -> Dict[str, Any]:
+        """Construye el cuerpo de la búsqueda KNN"""
+        search_body = {
+            "size": top_k,
+            "query": {
+                "knn": {
+                    "embedding": {
+                        "vector": query_embedding,
+                        "k": top_k
+                    }
+                }
+            },
+            "_source": ["content", "file_name", "metadata", "chunk_id"],
+            "min_score": min_score
+        }
+        
+        # Filtrar por tipos de archivo si se especifica
+        if file_types:
+            search_body["query"] = {
+                "bool": {
+                    "must": [search_body["query"]],
+                    "filter": {
+                        "terms": {"metadata.file_extension": file_types}
+                    }
+                }
+            }
+        
+        return search_body
+    
     def _format_results(self, response: Dict, query: str) -> Dict[str, Any]:
         """Formatea los resultados de OpenSearch"""
         fragments = []
@@ -161,6 +265,14 @@ def main():
         help="Consulta semántica a realizar"
     )
     
+    parser.add_argument(
+        "--query",
+        dest="extra_queries",
+        action="append",
+        default=[],
+        help="Consulta adicional (repetible); varias consultas se ejecutan en lote"
+    )
+    
     parser.add_argument(
         "--top-k",
         type=int,
@@ -198,17 +310,30 @@ def main():
         # Crear instancia de búsqueda
         search_tool = SemanticSearch(args.config)
         
-        # Realizar búsqueda
-        result = search_tool.search(
-            query=args.query,
-            top_k=args.top_k,
-            min_score=args.min_score,
-            file_types=args.file_types
-        )
+        # Realizar búsqueda (en lote si hay varias queries)
+        queries = [args.query] + args.extra_queries
+        if len(queries) > 1:
+            result = search_tool.search_many(
+                queries=queries,
+                top_k=args.top_k,
+                min_score=args.min_score,
+                file_types=args.file_types
+            )
+        else:
+            result = search_tool.search(
+                query=args.query,
+                top_k=args.top_k,
+                min_score=args.min_score,
+                file_types=args.file_types
+            )
         
         # Mostrar resultados
         if args.output == "json":
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print_json(result)
+        elif "results" in result:
+            for query_result in result['results']:
+                print_pretty_results(query_result)
+                print()
         else:
             print_pretty_results(result)
             
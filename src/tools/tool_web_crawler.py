@@ -17,10 +17,53 @@ import hashlib
 import json
 import yaml
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterator, List, Tuple
 from urllib.parse import urlparse
 import random
+import threading
+
+
+@lru_cache(maxsize=1024)
+def extract_domain(url: str) -> str:
+    """Devuelve el dominio (netloc) de una URL, cacheado por URL"""
+    return urlparse(url).netloc
+
+
+# Sesión HTTP compartida por todas las instancias (se crea al primer uso)
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session():
+    """
+    Devuelve la sesión HTTP compartida del módulo
+    
+    Reutilizar la sesión mantiene un pool de conexiones keep-alive, de modo
+    que las peticiones sucesivas al mismo host no repiten el handshake TCP+TLS.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                # Configurar reintentos
+                retry = Retry(
+                    total=2,
+                    backoff_factor=1.0,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=["GET"]
+                )
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=8, pool_maxsize=32)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _http_session = session
+    return _http_session
 
 
 class ToolResult:
@@ -110,7 +153,7 @@ class DomainWhitelist:
     def is_allowed(self, url: str, app_name: str) -> bool:
         """Verifica si una URL está permitida"""
         try:
-            domain = urlparse(url).netloc.replace('www.', '')
+            domain = extract_domain(url).replace('www.', '')
             
             # Modo permisivo: bloquear solo dominios en blacklist
             if self.permissive_mode:
@@ -387,8 +430,55 @@ class WebCrawlerTool:
                 execution_time_ms=(time.time() - start_time) * 1000
             )
     
+    def iter_url_recommendations(self, query: str, site: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Versión en streaming de search_and_extract
+        
+        Genera cada URL recomendada en cuanto DuckDuckGo la devuelve y supera
+        el filtro de dominios, sin esperar a tener la lista completa.
+        
+        Args:
+            query: Consulta de búsqueda
+            site: (Opcional) Dominio específico para limitar la búsqueda
+            
+        Yields:
+            Diccionarios con 'number', 'url' y 'description' (mismo formato
+            que los elementos de 'recommended_urls')
+            
+        Raises:
+            ValueError: Si la query es rechazada por el validador
+        """
+        is_valid, reason = self.query_validator.is_valid_query(query, self.app_name)
+        if not is_valid:
+            raise ValueError(f"Query rechazada: {reason}")
+        
+        enhanced_query = self.query_validator.enhance_query(query, self.app_name, site=site)
+        self.logger.info(f"Búsqueda web (streaming): {enhanced_query}")
+        
+        number = 0
+        for url in self._iter_duckduckgo(enhanced_query):
+            if number >= self.max_results:
+                break
+            if not self.domain_whitelist.is_allowed(url, self.app_name):
+                continue
+            
+            number += 1
+            yield {
+                'number': number,
+                'url': url,
+                'description': f"Recurso oficial sobre: {query}"
+            }
+    
     def _search_duckduckgo(self, query: str) -> List[str]:
         """Busca URLs usando DuckDuckGo"""
+        urls = list(self._iter_duckduckgo(query))
+        
+        if urls:
+            self.logger.info(f"DuckDuckGo encontró {len(urls)} URLs")
+        return urls
+    
+    def _iter_duckduckgo(self, query: str) -> Iterator[str]:
+        """Genera las URLs de DuckDuckGo a medida que llegan (máximo 10 resultados)"""
         try:
             # Usar el paquete duckduckgo-search
             try:
@@ -422,19 +512,22 @@ class WebCrawlerTool:
                     self.logger.debug("DDGS inicializado sin parámetros")
                 except (TypeError, Exception) as e2:
                     self.logger.error(f"No se pudo crear instancia de DDGS: {e2}")
-                    return []
+                    return
             
             if ddgs is None:
                 self.logger.error("No se pudo inicializar DDGS")
-                return []
+                return
             
-            # text() devuelve un generador y acepta parámetros de búsqueda
-            results = []
+            # text() devuelve un generador: cada URL se entrega según llega
+            count = 0
             try:
                 # Iterar sobre el generador con límite manual
                 for result in ddgs.text(query, region='wt-wt', safesearch='moderate', timelimit=None):
-                    results.append(result)
-                    if len(results) >= 10:
+                    count += 1
+                    url = result.get('href') or result.get('link')
+                    if url:
+                        yield url
+                    if count >= 10:
                         break
             except StopIteration:
                 pass
@@ -443,24 +536,20 @@ class WebCrawlerTool:
                 # Intentar sin parámetros opcionales
                 try:
                     for result in ddgs.text(query):
-                        results.append(result)
-                        if len(results) >= 10:
+                        if count >= 10:
                             break
+                        count += 1
+                        url = result.get('href') or result.get('link')
+                        if url:
+                            yield url
                 except Exception as e2:
                     self.logger.error(f"Error en búsqueda simplificada: {e2}")
             
-            if not results:
+            if not count:
                 self.logger.debug(f"DuckDuckGo no devolvió resultados para: {query}")
-                return []
-            
-            urls = [r.get('href') or r.get('link') for r in results if r.get('href') or r.get('link')]
-            
-            self.logger.info(f"DuckDuckGo encontró {len(urls)} URLs")
-            return urls
         
         except Exception as e:
             self.logger.debug(f"Error en búsqueda DuckDuckGo: {e}")
-            return []
     
     def _extract_content(self, url: str) -> Dict[str, Any]:
         """Extrae contenido de una URL"""
@@ -475,7 +564,7 @@ class WebCrawlerTool:
             }
         
         # Rate limiting
-        domain = urlparse(url).netloc
+        domain = extract_domain(url)
         self.rate_limiter.wait_if_needed(domain)
         
         # Intentar con Trafilatura
@@ -531,8 +620,6 @@ class WebCrawlerTool:
         try:
             import requests
             from bs4 import BeautifulSoup
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
             
             # Headers más realistas y completos para evitar detección
             headers = {
@@ -551,19 +638,8 @@ class WebCrawlerTool:
                 'Pragma': 'no-cache'
             }
             
-            # Crear sesión persistente con configuración robusta
-            session = requests.Session()
-            
-            # Configurar reintentos
-            retry = Retry(
-                total=2,
-                backoff_factor=1.0,
-                status_forcelist=(500, 502, 503, 504),
-                allowed_methods=["GET"]
-            )
-            adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=1)
-            session.mount('http://', adapter)
-            session.mount('https://', adapter)
+            # Sesión compartida con pool de conexiones y reintentos
+            session = _get_http_session()
             
             # Delay aleatorio antes del request (2-4 segundos)
             delay = random.uniform(2.0, 4.0)
@@ -701,6 +777,32 @@ def execute_web_crawler(params: Dict[str, Any], config_path: str = "config/web_c
     return tool.search_and_extract(query, site=site)
 
 
+def execute_web_crawler_stream(params: Dict[str, Any],
+                               config_path: str = "config/web_crawler_config.yaml") -> Iterator[Dict[str, Any]]:
+    """
+    Variante en streaming de execute_web_crawler
+    
+    Genera las URLs recomendadas una a una según se obtienen, en lugar de
+    devolver un ToolResult con la lista completa.
+    
+    Args:
+        params: Parámetros con 'query', opcionalmente 'app_name' y 'site'
+        config_path: Ruta al archivo de configuración
+        
+    Yields:
+        Diccionarios con 'number', 'url' y 'description'
+        
+    Raises:
+        ValueError: Si falta 'query' o la query es rechazada
+    """
+    query = params.get('query', '')
+    if not query:
+        raise ValueError("Parámetro 'query' es requerido")
+    
+    tool = WebCrawlerTool(app_name=params.get('app_name', 'mulesoft'), config_path=config_path)
+    yield from tool.iter_url_recommendations(query, site=params.get('site'))
+
+
 def main():
     """Función de testing"""
     logging.basicConfig(
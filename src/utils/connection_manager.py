@@ -1,11 +1,16 @@
 import os
 import yaml
 import boto3
+from botocore.config import Config as BotoConfig
 from opensearchpy import OpenSearch, RequestsHttpConnection
 from aws_requests_auth.aws_auth import AWSRequestsAuth
 from loguru import logger
 from dotenv import load_dotenv
 
+# Clientes Bedrock compartidos por región: evita resolver credenciales y crear
+# un pool HTTPS nuevo por cada ConnectionManager (uno por indexer/app)
+_BEDROCK_CLIENTS = {}
+
 class ConnectionManager:
     def __init__(self, config_path="config/aws_config_production.yaml", config_dict=None):
         load_dotenv()
@@ -91,10 +96,18 @@ class ConnectionManager:
     def get_bedrock_client(self):
         if self.bedrock_client is None:
             try:
-                self.bedrock_client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=self.config['bedrock']['region']
-                )
+                region = self.config['bedrock']['region']
+                if region not in _BEDROCK_CLIENTS:
+                    _BEDROCK_CLIENTS[region] = boto3.client(
+                        'bedrock-runtime',
+                        region_name=region,
+                        config=BotoConfig(
+                            max_pool_connections=32,
+                            retries={'max_attempts': 3, 'mode': 'adaptive'},
+                            tcp_keepalive=True
+                        )
+                    )
+                self.bedrock_client = _BEDROCK_CLIENTS[region]
                 logger.info("Bedrock client initialized successfully")
             except Exception as e:
                 logger.error(f"Error initializing Bedrock client: {e}")